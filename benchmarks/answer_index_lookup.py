@@ -0,0 +1,113 @@
+"""Benchmark for AnswerIndex lookups and adds at production-like sizes.
+
+Builds an index of synthetic, deliberately repetitive symptom descriptions
+(the same few dozen symptom words in English and Hindi, in one language and
+category), then times lookups of reworded near-duplicates and of unseen
+descriptions. Checks the p99 lookup CPU time against ANSWER_INDEX_LOOKUP_SLO_MS
+and the recall of near-duplicates. Exits non-zero when either is missed.
+Wall-clock percentiles are printed too; on a busy or CPU-throttled host
+their tail includes scheduler stalls that are not the index's doing.
+
+    python benchmarks/answer_index_lookup.py [entries]
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.answer_index import AnswerIndex
+
+SYMPTOMS_EN = [
+    "fever", "headache", "cough", "sore throat", "body ache", "cold", "runny nose",
+    "stomach pain", "vomiting", "diarrhea", "nausea", "chills", "weakness",
+    "dizziness", "back pain", "joint pain", "rash", "itching", "loss of appetite",
+    "burning urine", "ear pain", "eye pain", "toothache", "acidity", "gas",
+    "constipation", "sneezing", "tiredness", "swelling", "cramps"
+]
+SYMPTOMS_HI = [
+    "बुखार", "सिरदर्द", "खांसी", "गले में खराश", "बदन दर्द", "जुकाम", "पेट दर्द",
+    "उल्टी", "दस्त", "कमजोरी", "चक्कर", "जोड़ों में दर्द", "खुजली", "भूख न लगना"
+]
+DURATIONS = ["since yesterday", "for 2 days", "for 3 days", "for a week", "since morning",
+             "for 5 days", "since last night", "for 10 days"]
+INTENSITY = ["mild", "high", "slight", "bad", "", "", ""]
+
+
+def describe(rng):
+    words = SYMPTOMS_HI if rng.random() < 0.3 else SYMPTOMS_EN
+    parts = rng.sample(words, rng.randint(2, 4))
+    return f"{rng.choice(INTENSITY)} {' and '.join(parts)} {rng.choice(DURATIONS)}".strip()
+
+
+def reword(text, rng):
+    """A near-duplicate: same content with one typo and filler words"""
+    tokens = text.split()
+    i = rng.randrange(len(tokens))
+    if len(tokens[i]) > 5 and tokens[i].isascii():
+        tokens[i] = tokens[i][:-2] + tokens[i][-1]
+    return "I have " + " ".join(tokens) + " please help"
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    slo = float(os.getenv('ANSWER_INDEX_LOOKUP_SLO_MS', '2'))
+    rng = random.Random(7)
+    index = AnswerIndex()
+
+    stored = []
+    seen = set()
+    add_samples = []
+    build_start = time.perf_counter()
+    while len(index) < entries:
+        text = describe(rng)
+        start = time.perf_counter()
+        entry_id = index.add(text, "en", "general", f"answer for {text}", reviewed=True)
+        add_samples.append((time.perf_counter() - start) * 1000)
+        if entry_id not in seen:
+            seen.add(entry_id)
+            stored.append(text)
+    build_s = time.perf_counter() - build_start
+
+    lookup_samples = []
+    cpu_samples = []
+    found = 0
+    queries = 2000
+    for i in range(queries):
+        if i % 2 == 0:
+            query = reword(rng.choice(stored), rng)
+        else:
+            query = describe(rng) + " " + rng.choice(SYMPTOMS_EN)
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        match = index.lookup(query, "en", "general")
+        cpu_samples.append((time.thread_time() - cpu_start) * 1000)
+        lookup_samples.append((time.perf_counter() - start) * 1000)
+        if i % 2 == 0 and match and match["score"] >= 0.6:
+            found += 1
+    recall = found / (queries // 2)
+
+    p99 = percentile(cpu_samples, 0.99)
+    print(f"entries: {len(index)}  build: {build_s:.1f} s  "
+          f"add p50: {percentile(add_samples, 0.5):.3f} ms  p99: {percentile(add_samples, 0.99):.3f} ms")
+    print(f"lookups: {queries}  wall p50: {percentile(lookup_samples, 0.5):.3f} ms  "
+          f"p99: {percentile(lookup_samples, 0.99):.3f} ms  cpu p99: {p99:.3f} ms  SLO (cpu p99): {slo} ms")
+    print(f"near-duplicate recall: {recall:.2%}")
+
+    if p99 > slo:
+        print("FAIL: answer index lookup missed its latency SLO")
+        sys.exit(1)
+    if recall < 0.9:
+        print("FAIL: answer index missed near-duplicates")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark for the emergency fast path of /api/analyze-symptoms.
+
+Drives high-severity requests in every supported language through the Flask
+test client, with an LLM stub that sleeps, and checks the p99 latency
+against EMERGENCY_LATENCY_SLO_MS. Exits non-zero when the SLO is missed.
+
+    python benchmarks/emergency_latency.py [requests_per_language]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.main import app
+from src.services.llm_service import llm_service
+from src.services.emergency_service import emergency_service, EMERGENCY_MESSAGES
+
+
+class SlowLLMClient:
+    """Stands in for the Hugging Face client; any call would blow the SLO"""
+
+    def chat_completion(self, **kwargs):
+        time.sleep(5)
+        raise RuntimeError("The emergency fast path must not call the LLM")
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    requests_per_language = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    llm_service.client = SlowLLMClient()
+    client = app.test_client()
+
+    # Warm up routing and JSON encoding
+    client.post('/api/analyze-symptoms', json={"symptoms": "chest pain", "language": "en"})
+
+    samples = []
+    for language in EMERGENCY_MESSAGES:
+        for _ in range(requests_per_language):
+            start = time.perf_counter()
+            response = client.post('/api/analyze-symptoms', json={
+                "symptoms": "severe chest pain and difficulty breathing",
+                "language": language
+            })
+            samples.append((time.perf_counter() - start) * 1000)
+            body = response.get_json()
+            assert response.status_code == 200, body
+            assert body["data"]["severity"] == "high"
+            assert body["data"]["language"] == language
+
+    p50 = percentile(samples, 0.50)
+    p99 = percentile(samples, 0.99)
+    slo = emergency_service.latency_slo_ms
+    print(f"requests: {len(samples)}  p50: {p50:.3f} ms  p99: {p99:.3f} ms  max: {max(samples):.3f} ms  SLO (p99): {slo} ms")
+
+    if p99 > slo:
+        print("FAIL: emergency fast path missed its latency SLO")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""Replay captured request traces against the app.
+
+Reads a file written with TRAFFIC_CAPTURE_PATH and re-drives every trace
+through the Flask test client, at the recorded pace or scaled by --speed.
+The LLM and speech recognizer are replaced by stubs that sleep for the
+latencies recorded for that request, so the app's own overhead and its
+behaviour under the real traffic mix can be measured offline.
+
+Symptom text is synthesized from the recorded category, severity and
+length, keyed by the symptom hash so repeated descriptions stay repeated.
+Audio is sent as silent 16 kHz WAV of the recorded duration, whatever the
+original format was.
+
+    python benchmarks/replay_traffic.py traces.jsonl [--speed 2] [--workers 16]
+"""
+import io
+import os
+import sys
+import time
+import wave
+import argparse
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from statistics import median
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Never capture the replay itself (an empty value also wins over .env)
+os.environ['TRAFFIC_CAPTURE_PATH'] = ''
+
+from src.main import app
+from src.traffic_capture import read_traces
+from src.services.llm_service import llm_service
+from src.services.speech_service import speech_service
+
+# Words that steer detect_condition_category / _assess_severity without
+# tripping any other keyword list
+CATEGORY_WORDS = {
+    "fever": "temperature",
+    "respiratory": "cough",
+    "digestive": "nausea",
+    "general": "tired",
+    "emergency": "severe chest pain"
+}
+SEVERITY_WORDS = {"high": "severe", "medium": "persistent", "low": ""}
+
+_current = threading.local()
+
+
+class StageLatencies:
+    """Hands out recorded stage latencies for the request being replayed.
+
+    Calls made outside a replayed request (background elaboration) or
+    beyond what was recorded get the median latency of that stage.
+    """
+
+    def __init__(self, traces):
+        by_stage = defaultdict(list)
+        for trace in traces:
+            for name, ms in trace.get("stages", []):
+                by_stage[name].append(ms)
+        self.medians = {name: median(values) for name, values in by_stage.items()}
+
+    def begin(self, trace):
+        _current.stages = defaultdict(deque)
+        for name, ms in trace.get("stages", []):
+            _current.stages[name].append(ms)
+
+    def sleep(self, name):
+        stages = getattr(_current, "stages", None)
+        if stages and stages[name]:
+            ms = stages[name].popleft()
+        else:
+            ms = self.medians.get(name, 0.0)
+        time.sleep(ms / 1000)
+
+
+class _Message:
+    content = "**Possible causes:**\nA common seasonal infection.\n**Disclaimer:** This is not medical advice."
+
+
+class _Choice:
+    message = _Message()
+    finish_reason = "stop"
+
+
+class _Completion:
+    choices = [_Choice()]
+    usage = None
+
+
+class StubLLMClient:
+    def __init__(self, latencies):
+        self.latencies = latencies
+
+    def chat_completion(self, **kwargs):
+        self.latencies.sleep("llm")
+        return _Completion()
+
+
+class StubRecognizer:
+    """Takes the place of speech_recognition.Recognizer"""
+
+    def __init__(self, latencies, recognizer):
+        self.latencies = latencies
+        self.recognizer = recognizer
+
+    def adjust_for_ambient_noise(self, source, duration=0.5):
+        self.recognizer.adjust_for_ambient_noise(source, duration=duration)
+
+    def record(self, source):
+        return self.recognizer.record(source)
+
+    def recognize_google(self, audio_data, language="en-US", show_all=False, with_confidence=False):
+        self.latencies.sleep("recognizer")
+        if with_confidence:
+            return "replayed transcript", 0.9
+        return "replayed transcript"
+
+
+def synthesize_symptoms(trace):
+    """Deterministic stand-in for the recorded, never-stored symptom text"""
+    words = [SEVERITY_WORDS.get(trace.get("severity"), ""),
+             CATEGORY_WORDS.get(trace.get("category"), "tired"),
+             f"ref {trace.get('symptom_hash', '')}"]
+    text = " ".join(word for word in words if word)
+    padding = max(0, trace.get("symptom_chars", len(text)) - len(text))
+    return text + (" ok" * (padding // 3 + 1))[:padding]
+
+
+def silent_wav(duration):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(b"\0\0" * int(16000 * max(duration, 0.1)))
+    buffer.seek(0)
+    return buffer
+
+
+def replay_one(trace, latencies):
+    client = app.test_client()
+    latencies.begin(trace)
+    language = trace.get("language") or "en"
+
+    start = time.perf_counter()
+    if trace["endpoint"] == "/api/speech-to-text":
+        response = client.post(trace["endpoint"], data={
+            "audio": (silent_wav(trace.get("audio_duration", 1.0)), "replay.wav"),
+            "language": language
+        }, content_type="multipart/form-data")
+    else:
+        payload = {"symptoms": synthesize_symptoms(trace), "language": language}
+        if "elaborate" in trace.get("shape", {}):
+            payload["elaborate"] = True
+        response = client.open(trace["endpoint"], method=trace.get("method", "POST"), json=payload)
+    return trace, response.status_code, (time.perf_counter() - start) * 1000
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("trace_file")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="replay rate relative to the recording; 0 sends as fast as possible")
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    traces = sorted(read_traces(args.trace_file), key=lambda trace: trace["ts"])
+    if not traces:
+        print("No traces to replay")
+        return
+
+    latencies = StageLatencies(traces)
+    llm_service.client = StubLLMClient(latencies)
+    speech_service.recognizer = StubRecognizer(latencies, speech_service.recognizer)
+
+    futures = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for trace in traces:
+            if args.speed > 0:
+                due = (trace["ts"] - traces[0]["ts"]) / args.speed
+                delay = due - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            futures.append(executor.submit(replay_one, trace, latencies))
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+
+    by_endpoint = defaultdict(list)
+    for trace, status, ms in results:
+        by_endpoint[trace["endpoint"]].append((trace, status, ms))
+
+    print(f"replayed {len(results)} requests in {elapsed:.1f} s ({len(results) / elapsed:.1f} req/s)")
+    print(f"{'endpoint':<24} {'count':>6} {'status!=':>8} {'p50 rec':>9} {'p50 now':>9} {'p99 rec':>9} {'p99 now':>9}")
+    for endpoint, rows in sorted(by_endpoint.items()):
+        recorded = [trace["ms"] for trace, _, _ in rows]
+        replayed = [ms for _, _, ms in rows]
+        errors = sum(1 for trace, status, _ in rows if status != trace["status"])
+        print(f"{endpoint:<24} {len(rows):>6} {errors:>8} "
+              f"{percentile(recorded, 0.5):>7.1f}ms {percentile(replayed, 0.5):>7.1f}ms "
+              f"{percentile(recorded, 0.99):>7.1f}ms {percentile(replayed, 0.99):>7.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Benchmark for JSON serialization and response compression.
+
+Sends a representative Hindi analysis through /api/analyze-symptoms with a
+stubbed LLM and reports CPU time per request and bytes on the wire for the
+stdlib JSON provider versus orjson, uncompressed and with gzip/brotli.
+
+    python benchmarks/response_encoding.py [requests]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask.json.provider import DefaultJSONProvider
+from src.main import app
+from src.json_provider import OrjsonProvider, orjson
+from src.services.llm_service import llm_service
+
+HINDI_ANALYSIS = "\n".join([
+    "**संभावित कारण:**",
+    "* वायरल बुखार या सामान्य सर्दी-जुकाम, जो मौसम बदलने पर आम है",
+    "* गले का संक्रमण, जिसमें निगलने में दर्द और हल्का बुखार होता है",
+    "* शरीर में पानी की कमी, खासकर गर्मी के मौसम में",
+    "**घरेलू उपचार:**",
+    "1. दिन भर में कम से कम 8-10 गिलास पानी पिएं और नारियल पानी लें",
+    "2. गुनगुने नमक के पानी से दिन में तीन बार गरारे करें",
+    "3. अदरक और तुलसी की चाय शहद के साथ लें",
+    "4. पूरा आराम करें और हल्का, सुपाच्य भोजन जैसे खिचड़ी खाएं",
+    "**डॉक्टर से कब मिलें:**",
+    "* अगर बुखार तीन दिन से ज्यादा रहे या 102°F से ऊपर जाए",
+    "* सांस लेने में तकलीफ, सीने में दर्द या बहुत ज्यादा कमजोरी हो",
+    "* यह सलाह केवल जानकारी के लिए है, किसी योग्य डॉक्टर से परामर्श अवश्य लें",
+] * 3)
+
+
+class StubMessage:
+    content = HINDI_ANALYSIS
+
+
+class StubChoice:
+    message = StubMessage()
+    finish_reason = "stop"
+
+
+class StubCompletion:
+    choices = [StubChoice()]
+
+
+class StubLLMClient:
+    def chat_completion(self, **kwargs):
+        return StubCompletion()
+
+
+def run(client, requests, accept_encoding):
+    headers = {"Accept-Encoding": accept_encoding} if accept_encoding else {}
+    # Vary the symptoms so the answer index does not short-circuit the request
+    payloads = [{"symptoms": f"बुखार और गले में दर्द {i}", "language": "hi"} for i in range(requests)]
+    client.post('/api/analyze-symptoms', json=payloads[0], headers=headers)
+
+    size = 0
+    start = time.process_time()
+    for payload in payloads:
+        response = client.post('/api/analyze-symptoms', json=payload, headers=headers)
+        assert response.status_code == 200
+        size = len(response.data)
+        encoding = response.headers.get('Content-Encoding', 'identity')
+    cpu_ms = (time.process_time() - start) * 1000 / requests
+    return cpu_ms, size, encoding
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    llm_service.client = StubLLMClient()
+    llm_service.answer_retrieval.enabled = False
+    client = app.test_client()
+
+    providers = [("stdlib", DefaultJSONProvider(app))]
+    if orjson is not None:
+        providers.append(("orjson", OrjsonProvider(app)))
+
+    print(f"{'provider':<8} {'accept-encoding':<16} {'encoding':<9} {'cpu/request':>12} {'bytes':>7}")
+    for name, provider in providers:
+        app.json = provider
+        for accept_encoding in ("", "gzip", "br, gzip"):
+            cpu_ms, size, encoding = run(client, requests, accept_encoding)
+            print(f"{name:<8} {accept_encoding or '-':<16} {encoding:<9} {cpu_ms:>9.3f} ms {size:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,16 @@
+import os
+import hmac
+
+
+def get_admin_token() -> str:
+    """Token for the /api/admin endpoints.
+
+    PROFILE_ADMIN_TOKEN, which the profiler uses for X-Profile, is still
+    accepted when ADMIN_TOKEN is not set.
+    """
+    return os.getenv('ADMIN_TOKEN', '') or os.getenv('PROFILE_ADMIN_TOKEN', '')
+
+
+def is_admin_token(token: str) -> bool:
+    admin_token = get_admin_token()
+    return bool(admin_token and token) and hmac.compare_digest(token, admin_token)
@@ -0,0 +1,53 @@
+import os
+import gzip
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json'}
+
+
+def _accepted_encodings() -> set:
+    """Encodings the client accepts, ignoring any with q=0"""
+    encodings = set()
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        name, _, params = item.strip().partition(';')
+        if name and params.replace(' ', '') not in ('q=0', 'q=0.0'):
+            encodings.add(name.lower())
+    return encodings
+
+
+def configure_compression(app):
+    """Compress API responses with brotli or gzip when the client accepts it.
+
+    Responses smaller than COMPRESS_MIN_SIZE bytes are sent as-is, since
+    the encoding overhead outweighs the saving on tiny bodies.
+    """
+    min_size = int(os.getenv('COMPRESS_MIN_SIZE', '500'))
+    gzip_level = int(os.getenv('COMPRESS_GZIP_LEVEL', '6'))
+    brotli_quality = int(os.getenv('COMPRESS_BROTLI_QUALITY', '4'))
+
+    @app.after_request
+    def compress_response(response):
+        if (response.direct_passthrough or response.is_streamed
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or 'Content-Encoding' in response.headers
+                or response.status_code < 200 or response.status_code in (204, 304)):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+
+        accepted = _accepted_encodings()
+        if brotli is not None and 'br' in accepted:
+            response.set_data(brotli.compress(body, quality=brotli_quality))
+            response.headers['Content-Encoding'] = 'br'
+        elif 'gzip' in accepted:
+            response.set_data(gzip.compress(body, compresslevel=gzip_level))
+            response.headers['Content-Encoding'] = 'gzip'
+        return response
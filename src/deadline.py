@@ -0,0 +1,74 @@
+import os
+import time
+import logging
+from typing import Optional
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = 'X-Request-Deadline-Ms'
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a stage is reached with no time left in the request budget"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Request deadline exceeded before {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    """Time budget for one request, handed from the route to each stage"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """Timeout for the next upstream call: what is left, at most cap"""
+        remaining = self.remaining()
+        return min(remaining, cap) if cap is not None else remaining
+
+    def check(self, stage: str):
+        if self.expired():
+            raise DeadlineExceeded(stage)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """The deadline of the request being handled, if it has one"""
+    return g.get('deadline')
+
+
+def configure_deadlines(app):
+    """Give requests to the slow endpoints a deadline.
+
+    REQUEST_DEADLINES_MS maps paths to budgets ("/api/x=20000,/api/y=15000").
+    A client can ask for a shorter budget with the X-Request-Deadline-Ms
+    header, e.g. when it will give up sooner; it can never extend one.
+    """
+    deadlines = {}
+    setting = os.getenv('REQUEST_DEADLINES_MS', '/api/analyze-symptoms=25000,/api/speech-to-text=20000')
+    for item in setting.split(','):
+        path, _, ms = item.strip().partition('=')
+        if path and ms:
+            deadlines[path] = int(ms) / 1000
+
+    @app.before_request
+    def set_request_deadline():
+        seconds = deadlines.get(request.path)
+        if seconds is None:
+            return
+
+        requested = request.headers.get(DEADLINE_HEADER)
+        if requested:
+            try:
+                seconds = min(seconds, max(0, int(requested)) / 1000)
+            except ValueError:
+                logger.warning("Ignoring invalid %s header: %s", DEADLINE_HEADER, requested)
+        g.deadline = Deadline(seconds)
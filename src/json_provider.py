@@ -0,0 +1,42 @@
+import typing as t
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson.
+
+    orjson encodes straight to UTF-8 bytes, so responses skip the str
+    round trip. Types orjson does not know fall back to Flask's defaults.
+    """
+
+    option = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj: t.Any, **kwargs: t.Any) -> str:
+        # Only plain calls go through orjson; stdlib-specific options keep the default path
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.option).decode('utf-8')
+
+    def loads(self, s: t.Union[str, bytes], **kwargs: t.Any) -> t.Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: t.Any, **kwargs: t.Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            body = orjson.dumps(obj, default=self.default, option=self.option | orjson.OPT_INDENT_2)
+        else:
+            body = orjson.dumps(obj, default=self.default, option=self.option)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+def configure_json(app):
+    """Use orjson for request and response JSON when it is installed"""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
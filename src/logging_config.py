@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import threading
+import logging.handlers
+from datetime import datetime, timezone
+from flask import g, has_request_context, request
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "request_id"}
+
+ACCESS_LOGGER = "nirogai.access"
+
+
+class RequestContextFilter(logging.Filter):
+    """Tag records with the request ID and drop unsampled info logs.
+
+    Runs on the QueueHandler, i.e. in the thread that logged, where the
+    Flask request context is still available.
+    """
+
+    def __init__(self, info_sample_rate: float = 1.0):
+        super().__init__()
+        self.info_sample_rate = info_sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if has_request_context():
+            record.request_id = getattr(g, 'request_id', '-')
+            sampled = getattr(g, 'log_sampled', True)
+        else:
+            record.request_id = '-'
+            sampled = self.info_sample_rate >= 1.0 or random.random() < self.info_sample_rate
+
+        # Warnings and errors are always kept; the access log is sampled separately
+        if record.levelno > logging.INFO or record.name == ACCESS_LOGGER:
+            return True
+        return sampled
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps the exception text apart from the message.
+
+    The listener thread that formats and writes records is started by the
+    first record logged in each process. A gunicorn worker forked from a
+    --preload master therefore gets its own listener; the master's thread
+    does not survive the fork.
+    """
+
+    def __init__(self, output: logging.Handler):
+        super().__init__(queue.Queue(-1))
+        self.output = output
+        self.listener = None
+        self._listener_pid = None
+        self._listener_lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        # The lock may have been held by a thread that does not exist in the child
+        self._listener_lock = threading.Lock()
+
+    def _start_listener(self):
+        # A fresh queue, so records queued before a fork are not written twice
+        self.queue = queue.Queue(-1)
+        self.listener = logging.handlers.QueueListener(self.queue, self.output, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+        self._listener_pid = os.getpid()
+
+    def enqueue(self, record: logging.LogRecord):
+        if self._listener_pid != os.getpid():
+            with self._listener_lock:
+                if self._listener_pid != os.getpid():
+                    self._start_listener()
+        super().enqueue(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, 'request_id', '-')
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging():
+    """Set up the process-wide log handler.
+
+    Call it before importing the services, so what they log at import time
+    is formatted like everything else. Records go through a queue to a
+    listener thread that does the formatting and I/O, so request threads
+    only pay for an enqueue.
+    """
+    level = os.getenv('LOG_LEVEL', 'INFO').upper()
+    info_sample_rate = float(os.getenv('LOG_INFO_SAMPLE_RATE', '1.0'))
+
+    output = logging.StreamHandler()
+    if os.getenv('LOG_FORMAT', 'json') == 'json':
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s'))
+
+    queue_handler = StructuredQueueHandler(output)
+    queue_handler.addFilter(RequestContextFilter(info_sample_rate))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    return queue_handler
+
+
+def configure_logging(app):
+    """Give every request an ID (taken from X-Request-ID when present) and a
+    compact access log line. Expects setup_logging() to have run.
+    """
+    info_sample_rate = float(os.getenv('LOG_INFO_SAMPLE_RATE', '1.0'))
+    access_sample_rate = float(os.getenv('LOG_ACCESS_SAMPLE_RATE', '1.0'))
+    access_logger = logging.getLogger(ACCESS_LOGGER)
+
+    @app.before_request
+    def start_request_logging():
+        g.request_id = request.headers.get('X-Request-ID') or f"{random.getrandbits(64):016x}"
+        g.request_start = time.perf_counter()
+        g.log_sampled = info_sample_rate >= 1.0 or random.random() < info_sample_rate
+
+    @app.after_request
+    def log_access(response):
+        response.headers['X-Request-ID'] = g.get('request_id', '-')
+        if access_sample_rate >= 1.0 or random.random() < access_sample_rate:
+            duration_ms = (time.perf_counter() - g.get('request_start', time.perf_counter())) * 1000
+            access_logger.info(
+                "%s %s %s %.1fms",
+                request.method, request.path, response.status_code, duration_ms,
+                extra={
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "duration_ms": round(duration_ms, 1),
+                    "bytes": response.calculate_content_length()
+                }
+            )
+        return response
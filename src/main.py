@@ -6,15 +6,35 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from flask import Flask, send_from_directory
 from flask_cors import CORS
 from dotenv import load_dotenv
+
+load_dotenv()
+
+# Before the services are imported, so what they log at import time goes
+# through the same handler and format as everything else
+from src.logging_config import configure_logging, setup_logging
+setup_logging()
+
+from src.profiling import configure_profiling
+from src.json_provider import configure_json
+from src.compression import configure_compression
+from src.traffic_capture import configure_traffic_capture
+from src.deadline import configure_deadlines
 from src.models.user import db
 from src.routes.user import user_bp
 from src.routes.symptoms import symptoms_bp
 from src.routes.speech import speech_bp
-
-load_dotenv()
+from src.routes.admin import admin_bp
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+configure_logging(app)
+configure_profiling(app)
+configure_json(app)
+configure_compression(app)
+configure_traffic_capture(app)
+configure_deadlines(app)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
+# Request body ceiling; the speech blueprint applies a tighter per-request cap
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 
 # Enable CORS for all routes
 CORS(app, origins="*")
@@ -23,6 +43,7 @@ CORS(app, origins="*")
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(symptoms_bp, url_prefix='/api')
 app.register_blueprint(speech_bp, url_prefix='/api')
+app.register_blueprint(admin_bp, url_prefix='/api')
 
 # uncomment if you need to use database
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
@@ -0,0 +1,170 @@
+import os
+import sys
+import hmac
+import time
+import random
+import logging
+import tempfile
+import cProfile
+import threading
+from collections import Counter
+from datetime import datetime
+from flask import g, request
+from werkzeug.utils import secure_filename
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_EXTENSIONS = ('.collapsed', '.prof')
+
+
+def get_profile_dir() -> str:
+    return os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'nirogai_profiles'))
+
+
+def get_admin_token() -> str:
+    return os.getenv('PROFILE_ADMIN_TOKEN', '')
+
+
+def is_admin_token(token: str) -> bool:
+    admin_token = get_admin_token()
+    return bool(admin_token and token) and hmac.compare_digest(token, admin_token)
+
+
+class StackSampler:
+    """Samples the call stack of one thread at a fixed interval.
+
+    The result is in collapsed-stack format ("outer;inner;leaf count" per
+    line), which flamegraph.pl and speedscope read directly.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    """Profile one request with the stack sampler or cProfile"""
+
+    def __init__(self, mode: str, interval: float):
+        self.mode = mode
+        if mode == 'cprofile':
+            self.profiler = cProfile.Profile()
+        else:
+            self.profiler = StackSampler(threading.get_ident(), interval)
+
+    def start(self):
+        if self.mode == 'cprofile':
+            self.profiler.enable()
+        else:
+            self.profiler.start()
+
+    def stop_and_save(self, path_base: str) -> str:
+        if self.mode == 'cprofile':
+            self.profiler.disable()
+            path = f"{path_base}.prof"
+            self.profiler.dump_stats(path)
+        else:
+            self.profiler.stop()
+            path = f"{path_base}.collapsed"
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self.profiler.collapsed())
+        return path
+
+
+def list_profiles() -> list:
+    """Recent profiles, newest first"""
+    profile_dir = get_profile_dir()
+    if not os.path.isdir(profile_dir):
+        return []
+
+    profiles = []
+    for name in os.listdir(profile_dir):
+        if name.endswith(PROFILE_EXTENSIONS):
+            stat = os.stat(os.path.join(profile_dir, name))
+            profiles.append({
+                "name": name,
+                "size": stat.st_size,
+                "created": datetime.utcfromtimestamp(stat.st_mtime).isoformat()
+            })
+    return sorted(profiles, key=lambda profile: profile["created"], reverse=True)
+
+
+def _prune_profiles(max_files: int):
+    for profile in list_profiles()[max_files:]:
+        try:
+            os.unlink(os.path.join(get_profile_dir(), profile["name"]))
+        except OSError:
+            pass
+
+
+def configure_profiling(app):
+    """Register request profiling hooks when profiling is enabled.
+
+    PROFILE_SAMPLE_RATE profiles a random fraction of requests to
+    PROFILE_ENDPOINTS; with PROFILE_ADMIN_TOKEN set, a request carrying that
+    token in the X-Profile header is always profiled. When neither is set no
+    hooks are registered, so disabled profiling costs nothing per request.
+    """
+    sample_rate = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+    if sample_rate <= 0 and not get_admin_token():
+        return
+
+    endpoints = {
+        path.strip()
+        for path in os.getenv('PROFILE_ENDPOINTS', '/api/analyze-symptoms,/api/speech-to-text').split(',')
+        if path.strip()
+    }
+    mode = os.getenv('PROFILE_MODE', 'sampling')
+    interval = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '5')) / 1000
+    max_files = int(os.getenv('PROFILE_MAX_FILES', '50'))
+    os.makedirs(get_profile_dir(), exist_ok=True)
+
+    @app.before_request
+    def start_request_profile():
+        if request.path not in endpoints:
+            return
+        requested = is_admin_token(request.headers.get(PROFILE_HEADER, ''))
+        if requested or random.random() < sample_rate:
+            g.profiler = RequestProfiler(mode, interval)
+            g.profiler.start()
+
+    @app.teardown_request
+    def finish_request_profile(exc):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return
+
+        slug = request.path.strip('/').replace('/', '_')
+        name = secure_filename(f"{slug}_{int(time.time() * 1000)}_{g.get('request_id', 'req')}")
+        path_base = os.path.join(get_profile_dir(), name)
+        try:
+            path = profiler.stop_and_save(path_base)
+            logger.info("Saved request profile %s", os.path.basename(path))
+            _prune_profiles(max_files)
+        except Exception as e:
+            logger.error("Error saving request profile: %s", e)
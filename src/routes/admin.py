@@ -0,0 +1,113 @@
+from flask import Blueprint, request, jsonify, send_from_directory
+import logging
+from werkzeug.utils import secure_filename
+from src.admin_auth import get_admin_token, is_admin_token
+from src.profiling import get_profile_dir, list_profiles, PROFILE_EXTENSIONS
+from src.services.answer_index import answer_retrieval_service
+
+logger = logging.getLogger(__name__)
+
+admin_bp = Blueprint('admin', __name__)
+
+@admin_bp.before_request
+def require_admin_token():
+    """Admin endpoints (profiles, answer review) exist only when ADMIN_TOKEN (or PROFILE_ADMIN_TOKEN) is configured"""
+    if not get_admin_token():
+        return jsonify({
+            "success": False,
+            "error": "Not found"
+        }), 404
+
+    if not is_admin_token(request.headers.get('X-Admin-Token', '')):
+        return jsonify({
+            "success": False,
+            "error": "Unauthorized"
+        }), 401
+    return None
+
+@admin_bp.route('/admin/profiles', methods=['GET'])
+def get_profiles():
+    """List recent request profiles"""
+    try:
+        return jsonify({
+            "success": True,
+            "data": {
+                "profiles": list_profiles()
+            }
+        }), 200
+
+    except Exception as e:
+        logger.error("Error in get_profiles: %s", e)
+        return jsonify({
+            "success": False,
+            "error": "Internal server error"
+        }), 500
+
+@admin_bp.route('/admin/profiles/<name>', methods=['GET'])
+def download_profile(name):
+    """Download a profile (.collapsed for flamegraphs, .prof for pstats)"""
+    filename = secure_filename(name)
+    if filename != name or not filename.endswith(PROFILE_EXTENSIONS):
+        return jsonify({
+            "success": False,
+            "error": "Invalid profile name"
+        }), 400
+
+    return send_from_directory(get_profile_dir(), filename, as_attachment=True)
+
+@admin_bp.route('/admin/answers', methods=['GET'])
+def get_answers():
+    """List stored answers; ?reviewed=false lists the ones waiting for review"""
+    try:
+        reviewed = request.args.get('reviewed')
+        entries = answer_retrieval_service.index.entries(
+            reviewed=None if reviewed is None else reviewed.lower() == 'true',
+            offset=request.args.get('offset', 0, type=int),
+            limit=min(request.args.get('limit', 50, type=int), 500)
+        )
+        return jsonify({
+            "success": True,
+            "data": {
+                "enabled": answer_retrieval_service.enabled,
+                "answers": entries
+            }
+        }), 200
+
+    except Exception as e:
+        logger.error("Error in get_answers: %s", e)
+        return jsonify({
+            "success": False,
+            "error": "Internal server error"
+        }), 500
+
+@admin_bp.route('/admin/answers/<entry_id>/review', methods=['POST'])
+def review_answer(entry_id):
+    """Approve a stored answer for serving, or withdraw it with {"reviewed": false}"""
+    try:
+        data = request.get_json(silent=True) or {}
+        reviewed = data.get('reviewed', True)
+        if not isinstance(reviewed, bool):
+            return jsonify({
+                "success": False,
+                "error": "reviewed must be true or false"
+            }), 400
+
+        entry = answer_retrieval_service.review_answer(entry_id, reviewed)
+        if entry is None:
+            return jsonify({
+                "success": False,
+                "error": "Answer not found"
+            }), 404
+
+        logger.info("Answer %s marked reviewed=%s", entry_id, reviewed)
+        return jsonify({
+            "success": True,
+            "data": dict(entry, entry_id=entry_id)
+        }), 200
+
+    except Exception as e:
+        logger.error("Error in review_answer: %s", e)
+        return jsonify({
+            "success": False,
+            "error": "Internal server error"
+        }), 500
@@ -1,13 +1,19 @@
 from flask import Blueprint, request, jsonify
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import FormDataParser
+import io
 import os
+import json
 import tempfile
 import logging
 from datetime import datetime
 from src.services.speech_service import speech_service
+from src.services.audio_probe import probe_audio, detect_format, HEADER_SIZE
+from src.services.streaming_service import streaming_speech_service, SUPPORTED_SAMPLE_RATES, STREAM_ENCODINGS
+from src.traffic_capture import annotate_trace
+from src.deadline import current_deadline
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 speech_bp = Blueprint('speech', __name__)
@@ -15,7 +21,89 @@ speech_bp = Blueprint('speech', __name__)
 # Configuration
 UPLOAD_FOLDER = tempfile.gettempdir()
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
-ALLOWED_EXTENSIONS = {'.wav', '.mp3', '.m4a', '.ogg', '.flac'}
+MAX_REQUEST_SIZE = MAX_FILE_SIZE + 64 * 1024  # File plus multipart overhead
+MAX_AUDIO_DURATION = 120  # Seconds
+ALLOWED_EXTENSIONS = {'.wav', '.mp3', '.m4a', '.ogg', '.flac', '.webm', '.opus'}
+
+
+class InvalidAudioUpload(Exception):
+    """Raised while the upload is parsed, as soon as its header is not audio"""
+
+
+class ProbingUploadStream:
+    """Where the form parser writes an audio upload.
+
+    The first HEADER_SIZE bytes are held in memory and checked for a known
+    audio container before anything touches disk; junk aborts the parse
+    with InvalidAudioUpload. The rest is written to a temp file named after
+    the detected format, which is transcribed in place (see `path`) and
+    deleted when the request closes its files.
+    """
+
+    def __init__(self):
+        self._file = io.BytesIO()
+        self.format = None
+
+    def _check_header(self):
+        self.format = detect_format(self._file.getvalue()[:HEADER_SIZE])
+        if self.format is None:
+            raise InvalidAudioUpload("Unrecognized audio format")
+
+    def _spill(self):
+        data = self._file.getvalue()
+        self._file = tempfile.NamedTemporaryFile(dir=UPLOAD_FOLDER, prefix="temp_audio_", suffix=self.format)
+        self._file.write(data)
+
+    def write(self, data: bytes) -> int:
+        written = self._file.write(data)
+        if self.format is None and self._file.tell() >= HEADER_SIZE:
+            self._check_header()
+            self._spill()
+        return written
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if self.format is None:
+            # Uploads smaller than HEADER_SIZE are checked once complete
+            self._check_header()
+        return self._file.seek(offset, whence)
+
+    @property
+    def path(self) -> str:
+        """Path of the upload on disk, writing a small in-memory upload out first"""
+        if isinstance(self._file, io.BytesIO):
+            position = self._file.tell()
+            self._spill()
+            self._file.seek(position)
+        self._file.flush()
+        return self._file.name
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+def _probing_stream_factory(total_content_length, content_type, filename, content_length=None):
+    return ProbingUploadStream()
+
+
+class ProbingFormDataParser(FormDataParser):
+    """Form parser that sends file parts to a ProbingUploadStream"""
+
+    def __init__(self, stream_factory=None, **kwargs):
+        super().__init__(stream_factory=_probing_stream_factory, **kwargs)
+
+@speech_bp.before_request
+def limit_upload_size():
+    """Reject oversized uploads from the Content-Length header, before the body is read"""
+    if request.method != 'POST':
+        return None
+
+    # Chunked uploads have no Content-Length; the parser stops at this cap instead
+    request.max_content_length = MAX_REQUEST_SIZE
+    if request.endpoint == 'speech.speech_to_text':
+        request.form_data_parser_class = ProbingFormDataParser
+    if request.content_length is not None and request.content_length > MAX_REQUEST_SIZE:
+        return _too_large_response()
+    return None
 
 @speech_bp.route('/speech-to-text', methods=['POST'])
 def speech_to_text():
@@ -39,11 +127,16 @@ def speech_to_text():
         
         # Get language parameter
         language = request.form.get('language', 'en')
+
+        # Auto mode tries several languages at once; a selected language is tried first
+        auto_detect = language == 'auto' or request.form.get('auto_detect', '').lower() == 'true'
         
         # Validate language
         supported_languages = ['en', 'hi', 'ta', 'bn', 'te', 'mr', 'gu', 'kn']
+        hint = language if language in supported_languages else None
         if language not in supported_languages:
             language = 'en'  # Default to English
+        candidates = speech_service.auto_candidates(hint) if auto_detect else None
         
         # Validate file
         if not _allowed_file(file.filename):
@@ -52,26 +145,45 @@ def speech_to_text():
                 "error": f"Unsupported file format. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
             }), 400
         
-        # Save uploaded file temporarily
+        # Identify the format and duration from the headers, without decoding
+        probe_result = probe_audio(file.stream)
+        if not probe_result.get('valid', False):
+            return jsonify({
+                "success": False,
+                "error": probe_result.get('error', 'Invalid audio file')
+            }), 400
+
+        annotate_trace(
+            audio_format=probe_result['format'],
+            audio_codec=probe_result.get('codec'),
+            audio_bytes=probe_result['file_size'],
+            audio_duration=round(probe_result['duration'], 2)
+        )
+
+        if probe_result['file_size'] > MAX_FILE_SIZE:
+            return _too_large_response()
+
+        if probe_result['duration'] > MAX_AUDIO_DURATION:
+            return jsonify({
+                "success": False,
+                "error": f"Audio too long (max {MAX_AUDIO_DURATION} seconds)"
+            }), 400
+        
         filename = secure_filename(file.filename)
-        temp_path = os.path.join(UPLOAD_FOLDER, f"temp_audio_{datetime.utcnow().timestamp()}_{filename}")
         
         try:
-            file.save(temp_path)
-            
-            # Validate the saved file
-            validation_result = speech_service.validate_audio_file(temp_path)
-            if not validation_result.get('valid', False):
-                return jsonify({
-                    "success": False,
-                    "error": validation_result.get('error', 'Invalid audio file')
-                }), 400
-            
-            # Log the request
-            logger.info(f"Processing speech-to-text for language: {language}, file: {filename}")
-            
-            # Transcribe the audio
-            transcription_result = speech_service.transcribe_audio(temp_path, language)
+            if probe_result.get('codec') == 'opus':
+                # Compact Opus recordings are decoded in memory, without a temp file
+                logger.info("Processing speech-to-text for language: %s, file: %s", language, filename)
+                transcription_result = speech_service.transcribe_opus(
+                    file.stream.read(), language, candidates, deadline=current_deadline()
+                )
+            else:
+                # The parser already wrote the upload to a temp file named after its format
+                logger.info("Processing speech-to-text for language: %s, file: %s", language, filename)
+                transcription_result = speech_service.transcribe_audio(
+                    file.stream.path, language, candidates, deadline=current_deadline()
+                )
             
             # Prepare response
             if transcription_result.get('success', False):
@@ -80,19 +192,29 @@ def speech_to_text():
                     "data": {
                         "text": transcription_result['text'],
                         "confidence": transcription_result.get('confidence', 0.0),
-                        "language": language,
+                        "language": transcription_result.get('language', language),
                         "method": transcription_result.get('method', 'unknown'),
                         "file_info": {
                             "filename": filename,
-                            "size": validation_result.get('file_size', 0),
-                            "format": validation_result.get('format', 'unknown')
+                            "size": probe_result.get('file_size', 0),
+                            "format": probe_result.get('format', 'unknown'),
+                            "duration": round(probe_result.get('duration', 0.0), 2)
                         }
                     },
                     "timestamp": datetime.utcnow().isoformat(),
                     "request_id": f"speech_{datetime.utcnow().timestamp()}"
                 }
+                if 'auto_detect' in transcription_result:
+                    response_data["data"]["auto_detect"] = transcription_result['auto_detect']
                 
                 return jsonify(response_data), 200
+            elif transcription_result.get('timed_out'):
+                annotate_trace(degraded=True)
+                return jsonify({
+                    "success": False,
+                    "error": transcription_result['error'],
+                    "timed_out": True
+                }), 504
             else:
                 return jsonify({
                     "success": False,
@@ -101,21 +223,124 @@ def speech_to_text():
                 }), 500
                 
         finally:
-            # Clean up temporary file
-            try:
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
-            except Exception as e:
-                logger.warning(f"Failed to delete temporary file {temp_path}: {e}")
+            # Deletes the temp file the parser wrote the upload to
+            file.close()
         
+    except RequestEntityTooLarge:
+        return _too_large_response()
+
+    except InvalidAudioUpload as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
     except Exception as e:
-        logger.error(f"Error in speech_to_text: {str(e)}")
+        logger.error("Error in speech_to_text: %s", e)
         return jsonify({
             "success": False,
             "error": "Internal server error",
             "details": str(e) if request.args.get('debug') else None
         }), 500
 
+@speech_bp.route('/speech/stream', methods=['GET'])
+def stream_speech_to_text():
+    """Live transcription over a WebSocket.
+
+    The client sends a JSON {"type": "start", "language": ..., "encoding": ...,
+    "sample_rate": ...} message, then binary frames, then {"type": "stop"}.
+    With encoding "pcm" (the default) frames are 16-bit mono PCM at a
+    sample rate from SUPPORTED_SAMPLE_RATES; with "opus" they are the chunks
+    of a MediaRecorder Opus (WebM/Ogg) recording and sample_rate is ignored.
+    Partial transcripts are pushed back as each utterance is recognized.
+    A session that reaches its length limit is finished as if the client
+    had stopped.
+    Needs a gevent-websocket server, e.g.
+    gunicorn -k geventwebsocket.gunicorn.workers.GeventWebSocketWorker src.main:app
+    """
+    ws = request.environ.get('wsgi.websocket')
+    if ws is None:
+        return jsonify({
+            "success": False,
+            "error": "WebSocket connection required"
+        }), 400
+
+    session = None
+    try:
+        while True:
+            message = ws.receive()
+            if message is None:
+                break
+
+            if isinstance(message, str):
+                control = json.loads(message)
+                if control.get('type') == 'start':
+                    language = control.get('language', 'en')
+                    if language not in speech_service.language_codes:
+                        language = 'en'
+                    encoding = control.get('encoding', 'pcm')
+                    if encoding not in STREAM_ENCODINGS:
+                        ws.send(json.dumps({
+                            "type": "error",
+                            "error": f"Unsupported encoding, use one of {list(STREAM_ENCODINGS)}"
+                        }))
+                        continue
+                    try:
+                        sample_rate = int(control.get('sample_rate', 16000))
+                    except (TypeError, ValueError):
+                        sample_rate = None
+                    if encoding == 'pcm' and sample_rate not in SUPPORTED_SAMPLE_RATES:
+                        ws.send(json.dumps({
+                            "type": "error",
+                            "error": f"Unsupported sample rate, use one of {list(SUPPORTED_SAMPLE_RATES)}"
+                        }))
+                        continue
+                    if session is not None:
+                        session.drain(0)
+                    try:
+                        session = streaming_speech_service.create_session(language, sample_rate, encoding)
+                    except OSError as e:
+                        # ffmpeg missing or not startable: the client can fall back to PCM
+                        logger.error("Could not start %s stream decoder: %s", encoding, e)
+                        session = None
+                        ws.send(json.dumps({"type": "error", "error": f"Encoding {encoding} not available"}))
+                        continue
+                    logger.info("Streaming speech-to-text for language: %s (%s)", language, encoding)
+                    ws.send(json.dumps({
+                        "type": "ready",
+                        "language": language,
+                        "encoding": encoding,
+                        "sample_rate": session.sample_rate
+                    }))
+                elif control.get('type') == 'stop':
+                    break
+                continue
+
+            if session is None:
+                ws.send(json.dumps({"type": "error", "error": "Send a start message first"}))
+                continue
+
+            for event in session.feed_audio(message) + session.poll_results():
+                ws.send(json.dumps(event))
+
+            if session.limit_reached():
+                ws.send(json.dumps({"type": "error", "error": "Session length limit reached"}))
+                break
+
+        if session is not None:
+            events = session.finish() + session.drain(streaming_speech_service.drain_timeout)
+            for event in events:
+                ws.send(json.dumps(event))
+            ws.send(json.dumps({"type": "final", "text": session.transcript}))
+            ws.close()
+
+    except Exception as e:
+        logger.error("Error in stream_speech_to_text: %s", e)
+        if session is not None:
+            session.drain(0)
+
+    return ''
+
 @speech_bp.route('/speech/supported-formats', methods=['GET'])
 def get_supported_formats():
     """Get list of supported audio formats"""
@@ -171,7 +396,7 @@ def get_supported_formats():
         }), 200
         
     except Exception as e:
-        logger.error(f"Error in get_supported_formats: {str(e)}")
+        logger.error("Error in get_supported_formats: %s", e)
         return jsonify({
             "success": False,
             "error": "Internal server error"
@@ -193,13 +418,19 @@ def test_speech_service():
         }), 200
         
     except Exception as e:
-        logger.error(f"Error in test_speech_service: {str(e)}")
+        logger.error("Error in test_speech_service: %s", e)
         return jsonify({
             "success": False,
             "error": "Speech service test failed",
             "details": str(e)
         }), 500
 
+def _too_large_response():
+    return jsonify({
+        "success": False,
+        "error": f"File size too large (max {MAX_FILE_SIZE // (1024 * 1024)}MB)"
+    }), 413
+
 def _allowed_file(filename):
     """Check if file extension is allowed"""
     if not filename:
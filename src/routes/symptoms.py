@@ -1,10 +1,12 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime
+import uuid
 import logging
 from src.services.llm_service import llm_service
+from src.services.emergency_service import emergency_service
+from src.traffic_capture import annotate_trace
+from src.deadline import current_deadline
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 symptoms_bp = Blueprint('symptoms', __name__)
@@ -39,12 +41,29 @@ def analyze_symptoms():
         if language not in supported_languages:
             language = 'en'  # Default to English
         
+        # Emergency fast path: answer high-severity symptoms without waiting for the LLM
+        severity = _assess_severity(symptoms)
+        annotate_trace(severity=severity)
+        if severity == "high" and emergency_service.enabled:
+            return _emergency_response(symptoms, language, data)
+
         # Log the request
-        logger.info(f"Analyzing symptoms for language: {language}, user: {user_id}")
+        logger.info("Analyzing symptoms for language: %s, user: %s", language, user_id)
         
         # Analyze symptoms using LLM service
-        analysis_result = llm_service.analyze_symptoms(symptoms, language)
+        analysis_result = llm_service.analyze_symptoms(symptoms, language, deadline=current_deadline())
         
+        annotate_trace(category=analysis_result.get('condition_category'), retrieved='retrieval' in analysis_result)
+        if analysis_result.get('timed_out'):
+            # The LLM ran out of time: answer with general guidance rather than an error
+            annotate_trace(degraded=True)
+            analysis_result = {
+                "success": True,
+                "analysis": _get_degraded_analysis(language),
+                "condition_category": analysis_result.get('condition_category', 'general'),
+                "degraded": True
+            }
+
         if not analysis_result.get('success', False):
             return jsonify({
                 "success": False,
@@ -58,24 +77,56 @@ def analyze_symptoms():
                 "analysis": analysis_result['analysis'],
                 "condition_category": analysis_result.get('condition_category', 'general'),
                 "language": language,
-                "severity": _assess_severity(symptoms),
+                "severity": severity,
                 "recommendations": _get_general_recommendations(language),
                 "disclaimer": _get_medical_disclaimer(language)
             },
             "timestamp": datetime.utcnow().isoformat(),
             "request_id": f"req_{datetime.utcnow().timestamp()}"
         }
+
+        # Expose the similarity score when a stored answer was served
+        if analysis_result.get('retrieval'):
+            response_data["data"]["retrieval"] = analysis_result['retrieval']
+
+        # Tell the client the analysis is a fallback (or untranslated) so it can offer a retry
+        if analysis_result.get('degraded'):
+            response_data["data"]["degraded"] = True
         
         return jsonify(response_data), 200
         
     except Exception as e:
-        logger.error(f"Error in analyze_symptoms: {str(e)}")
+        logger.error("Error in analyze_symptoms: %s", e)
         return jsonify({
             "success": False,
             "error": "Internal server error",
             "details": str(e) if request.args.get('debug') else None
         }), 500
 
+@symptoms_bp.route('/analysis/<request_id>', methods=['GET'])
+def get_analysis_elaboration(request_id):
+    """Get the LLM elaboration started for an emergency fast-path response"""
+    try:
+        elaboration = emergency_service.get_elaboration(request_id)
+        if elaboration is None:
+            return jsonify({
+                "success": False,
+                "error": "Analysis not found"
+            }), 404
+
+        return jsonify({
+            "success": True,
+            "data": elaboration,
+            "request_id": request_id
+        }), 200
+
+    except Exception as e:
+        logger.error("Error in get_analysis_elaboration: %s", e)
+        return jsonify({
+            "success": False,
+            "error": "Internal server error"
+        }), 500
+
 @symptoms_bp.route('/health-info/<topic>', methods=['GET'])
 def get_health_info(topic):
     """Get detailed health information about a specific topic"""
@@ -112,7 +163,7 @@ def get_health_info(topic):
         return jsonify(response_data), 200
         
     except Exception as e:
-        logger.error(f"Error in get_health_info: {str(e)}")
+        logger.error("Error in get_health_info: %s", e)
         return jsonify({
             "success": False,
             "error": "Internal server error"
@@ -173,12 +224,55 @@ def get_supported_languages():
         }), 200
         
     except Exception as e:
-        logger.error(f"Error in get_supported_languages: {str(e)}")
+        logger.error("Error in get_supported_languages: %s", e)
         return jsonify({
             "success": False,
             "error": "Internal server error"
         }), 500
 
+def _emergency_response(symptoms: str, language: str, data: dict):
+    """Build the instant emergency response, optionally queueing the LLM elaboration"""
+    emergency = emergency_service.get_response(language)
+    annotate_trace(category="emergency")
+    # Random, so an elaboration can neither be guessed nor collide with another
+    request_id = f"req_{uuid.uuid4().hex}"
+
+    response_data = {
+        "success": True,
+        "data": {
+            "analysis": emergency["analysis"],
+            "condition_category": "emergency",
+            "language": language,
+            "severity": "high",
+            "emergency": {
+                "title": emergency["title"],
+                "message": emergency["message"],
+                "helplines": emergency["helplines"]
+            },
+            "recommendations": emergency["actions"],
+            "disclaimer": _get_medical_disclaimer(language)
+        },
+        "timestamp": datetime.utcnow().isoformat(),
+        "request_id": request_id
+    }
+
+    if _parse_flag(data.get('elaborate'), emergency_service.elaborate_by_default):
+        emergency_service.start_elaboration(request_id, symptoms, language)
+        response_data["data"]["elaboration"] = {
+            "status": "pending",
+            "url": f"/api/analysis/{request_id}"
+        }
+
+    return jsonify(response_data), 200
+
+def _parse_flag(value, default: bool) -> bool:
+    """Read a boolean request field; the string "false" must not count as true"""
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.lower() == 'true'
+    return value is True
+
 def _assess_severity(symptoms: str) -> str:
     """Assess symptom severity based on keywords"""
     symptoms_lower = symptoms.lower()
@@ -224,6 +318,15 @@ def _get_general_recommendations(language: str) -> list:
     
     return recommendations.get(language, recommendations["en"])
 
+def _get_degraded_analysis(language: str) -> str:
+    """Analysis text used when the AI service does not answer within the deadline"""
+    messages = {
+        "en": "We could not prepare a detailed analysis right now. Please follow the general recommendations below and try again in a few minutes. If your symptoms are severe or getting worse, contact a doctor or call 108.",
+        "hi": "हम अभी विस्तृत विश्लेषण तैयार नहीं कर सके। कृपया नीचे दी गई सामान्य सलाह का पालन करें और कुछ मिनट बाद फिर से प्रयास करें। यदि लक्षण गंभीर हैं या बढ़ रहे हैं, तो डॉक्टर से संपर्क करें या 108 पर कॉल करें।"
+    }
+
+    return messages.get(language, messages["en"])
+
 def _get_medical_disclaimer(language: str) -> str:
     """Get medical disclaimer based on language"""
     disclaimers = {
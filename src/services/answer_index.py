@@ -0,0 +1,463 @@
+import os
+import re
+import json
+import time
+import hashlib
+import random
+import threading
+import unicodedata
+import logging
+from collections import Counter, OrderedDict
+from typing import Dict, FrozenSet, List, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Letters, digits and the combining marks of the Indic blocks (Devanagari to
+# Malayalam), minus the danda punctuation, so "बुखार" stays a single token
+_TOKEN_PATTERN = re.compile(r"[\w\u0900-\u0963\u0966-\u0DFF]+")
+
+# Filler words that do not change the meaning of a symptom description
+STOPWORDS = {
+    # English
+    "i", "im", "me", "my", "a", "an", "the", "and", "or", "is", "am", "are", "was",
+    "have", "has", "had", "having", "been", "be", "since", "from", "for", "of", "to",
+    "with", "in", "on", "at", "it", "its", "also", "very", "some", "feel", "feeling",
+    "got", "getting", "last", "past", "about", "please", "help", "doctor",
+    # Hindi / Hinglish
+    "मुझे", "मेरे", "मेरा", "मेरी", "है", "हैं", "से", "का", "की", "के", "और", "में",
+    "हो", "रहा", "रही", "था", "थी", "भी", "mujhe", "hai", "se", "aur", "ka", "ki", "ke",
+    # Tamil
+    "எனக்கு", "மற்றும்", "இருக்கிறது"
+}
+
+NUMBER_WORDS = {
+    "one": "1", "two": "2", "three": "3", "four": "4", "five": "5",
+    "six": "6", "seven": "7", "eight": "8", "nine": "9", "ten": "10",
+    "एक": "1", "दो": "2", "तीन": "3", "चार": "4", "पांच": "5", "पाँच": "5"
+}
+
+_HASH_MASK = (1 << 64) - 1
+
+
+def _normalize_token(token: str) -> str:
+    """Map number words and non-ASCII digits to ASCII digits and strip plurals"""
+    if token in NUMBER_WORDS:
+        return NUMBER_WORDS[token]
+    if any(ch.isdigit() for ch in token):
+        return "".join(str(unicodedata.digit(ch)) if ch.isdigit() else ch for ch in token)
+    if token.isascii() and len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Script-aware tokenization with filler-word removal"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return [
+        _normalize_token(token)
+        for token in _TOKEN_PATTERN.findall(text)
+        if token not in STOPWORDS
+    ]
+
+
+def shingles(text: str) -> FrozenSet[str]:
+    """Feature set of a symptom description: tokens plus character trigrams.
+
+    Whole tokens make word order irrelevant; trigrams of longer tokens keep
+    small misspellings ("fevr" vs "fever") from breaking the match.
+    """
+    features = set()
+    for token in tokenize(text):
+        features.add(f"#{token}")
+        if len(token) >= 4:
+            padded = f"<{token}>"
+            features.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(features)
+
+
+def entry_key(language: str, category: str, features: FrozenSet[str]) -> str:
+    """Stable id of an entry, the same in every worker and across restarts"""
+    material = "\x1f".join([language, category] + sorted(features))
+    return hashlib.sha1(material.encode("utf-8")).hexdigest()[:16]
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+class AnswerIndex:
+    """MinHash/LSH index of past (symptoms, language, category) -> answer pairs.
+
+    Only reviewed answers are in the LSH buckets, so unreviewed ones can
+    never crowd them out of a lookup. Unreviewed answers wait in a review
+    queue of at most `max_pending` entries; the oldest is dropped when it
+    is full.
+
+    The MinHash signature covers whole tokens only; character trigrams are
+    shared by too many descriptions and would fill every bucket. Lookups
+    score at most `max_candidates` entries, those sharing the most bands
+    with the query, with the exact Jaccard similarity over all features.
+    Entries are keyed by a hash of their language, category and features,
+    so identical descriptions are found without a scan.
+    """
+
+    def __init__(self, num_bands: int = 10, rows_per_band: int = 6, max_candidates: int = 32,
+                 max_pending: int = 1000, seed: int = 1):
+        self.num_bands = num_bands
+        self.rows_per_band = rows_per_band
+        self.max_candidates = max_candidates
+        self.max_pending = max_pending
+        num_perm = num_bands * rows_per_band
+        rng = random.Random(seed)
+        # XOR with a random mask is a cheap stand-in for a hash permutation
+        self._masks = np.array([rng.getrandbits(64) for _ in range(num_perm)], dtype=np.uint64)
+        self._entries: Dict[str, Dict] = {}
+        self._buckets: Dict[Tuple, List[str]] = {}
+        # Unreviewed entry ids, oldest first
+        self._pending: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def _signature(self, features: FrozenSet[str]) -> List[int]:
+        hashes = np.array([hash(feature) & _HASH_MASK for feature in features if feature.startswith("#")],
+                          dtype=np.uint64)
+        return (hashes[:, None] ^ self._masks[None, :]).min(axis=0).tolist()
+
+    def _band_keys(self, signature: List[int], language: str, category: str) -> List[Tuple]:
+        rows = self.rows_per_band
+        return [
+            (language, category, band, tuple(signature[band * rows:(band + 1) * rows]))
+            for band in range(self.num_bands)
+        ]
+
+    def _entry_band_keys(self, entry: Dict) -> List[Tuple]:
+        return self._band_keys(self._signature(entry["features"]), entry["language"], entry["category"])
+
+    def _find(self, features: FrozenSet[str], band_keys: List[Tuple]) -> Tuple[Optional[str], float]:
+        """Return the best matching reviewed entry id and its score"""
+        candidates = Counter()
+        for key in band_keys:
+            # Newest entries first, so a crowded bucket cannot make this unbounded
+            candidates.update(self._buckets.get(key, ())[-self.max_candidates:])
+
+        best_id, best_score = None, 0.0
+        for entry_id, _ in candidates.most_common(self.max_candidates):
+            entry = self._entries.get(entry_id)
+            if entry is None:
+                continue
+            score = jaccard(features, entry["features"])
+            if score > best_score:
+                best_id, best_score = entry_id, score
+        return best_id, best_score
+
+    def _serve(self, entry_id: str, band_keys: List[Tuple]):
+        """Move an entry from the review queue into the buckets (lock held)"""
+        self._pending.pop(entry_id, None)
+        for key in band_keys:
+            self._buckets.setdefault(key, []).append(entry_id)
+
+    def _unserve(self, entry_id: str, band_keys: List[Tuple]):
+        """Take an entry out of the buckets and queue it for review (lock held)"""
+        for key in band_keys:
+            bucket = self._buckets.get(key)
+            if bucket and entry_id in bucket:
+                bucket.remove(entry_id)
+        self._queue(entry_id)
+
+    def _queue(self, entry_id: str):
+        self._pending[entry_id] = None
+        while len(self._pending) > self.max_pending:
+            dropped, _ = self._pending.popitem(last=False)
+            del self._entries[dropped]
+
+    def add(self, symptoms: str, language: str, category: str, answer: str,
+            reviewed: bool = False) -> Optional[str]:
+        """Add an answer, replacing the stored answer for an identical description.
+
+        A reviewed answer is never replaced by an unreviewed one; the new
+        answer is dropped and None is returned.
+        """
+        features = shingles(symptoms)
+        if not features:
+            return None
+
+        entry_id = entry_key(language, category, features)
+        # Only reviewed entries need their bands
+        band_keys = self._band_keys(self._signature(features), language, category) if reviewed else None
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is not None:
+                if entry["reviewed"] and not reviewed:
+                    return None
+                entry["symptoms"] = symptoms
+                entry["answer"] = answer
+                if reviewed and not entry["reviewed"]:
+                    self._serve(entry_id, band_keys)
+                entry["reviewed"] = reviewed
+                return entry_id
+
+            self._entries[entry_id] = {
+                "symptoms": symptoms,
+                "language": language,
+                "category": category,
+                "answer": answer,
+                "reviewed": reviewed,
+                "features": features
+            }
+            if reviewed:
+                self._serve(entry_id, band_keys)
+            else:
+                self._queue(entry_id)
+            return entry_id
+
+    def mark_reviewed(self, entry_id: str, reviewed: bool = True) -> Optional[Dict]:
+        """Set the review flag of an entry; returns the entry, or None for an unknown id"""
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is None:
+                return None
+            if entry["reviewed"] != reviewed:
+                band_keys = self._entry_band_keys(entry)
+                if reviewed:
+                    self._serve(entry_id, band_keys)
+                else:
+                    self._unserve(entry_id, band_keys)
+                entry["reviewed"] = reviewed
+            return {key: value for key, value in entry.items() if key != "features"}
+
+    def find_entry(self, symptoms: str, language: str, category: str) -> Optional[str]:
+        """Id of the entry for exactly this description, if there is one"""
+        entry_id = entry_key(language, category, shingles(symptoms))
+        return entry_id if entry_id in self._entries else None
+
+    def entries(self, reviewed: Optional[bool] = None, offset: int = 0, limit: int = 50) -> List[Dict]:
+        """Stored entries (without features), optionally filtered by review state"""
+        with self._lock:
+            if reviewed is False:
+                ids = list(self._pending)
+            else:
+                ids = [entry_id for entry_id, entry in self._entries.items()
+                       if reviewed is None or entry["reviewed"]]
+            selected = [
+                dict({key: value for key, value in self._entries[entry_id].items() if key != "features"},
+                     entry_id=entry_id)
+                for entry_id in ids[offset:offset + limit]
+            ]
+        return selected
+
+    def lookup(self, symptoms: str, language: str, category: str) -> Optional[Dict]:
+        """Find the most similar reviewed answer for the same language and category"""
+        features = shingles(symptoms)
+        if not features:
+            return None
+
+        entry_id = entry_key(language, category, features)
+        entry = self._entries.get(entry_id)
+        if entry is not None and entry["reviewed"]:
+            score = 1.0
+        else:
+            band_keys = self._band_keys(self._signature(features), language, category)
+            entry_id, score = self._find(features, band_keys)
+            if entry_id is None:
+                return None
+            entry = self._entries.get(entry_id)
+            if entry is None:
+                return None
+
+        return {
+            "entry_id": entry_id,
+            "score": round(score, 4),
+            "answer": entry["answer"],
+            "matched_symptoms": entry["symptoms"]
+        }
+
+    def apply_record(self, record: Dict) -> bool:
+        """Apply one record of the index file; True if it was an answer"""
+        if record.get("action") == "review":
+            # A review decision made through the admin API
+            entry_id = self.find_entry(record["symptoms"], record["language"], record["category"])
+            if entry_id is not None:
+                self.mark_reviewed(entry_id, record.get("reviewed", True))
+            return False
+        self.add(record["symptoms"], record["language"], record["category"],
+                 record["answer"], reviewed=record.get("reviewed", False))
+        return True
+
+    def load(self, path: str) -> int:
+        """Load entries from a JSON-lines file written by save()"""
+        loaded = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip() and self.apply_record(json.loads(line)):
+                    loaded += 1
+        return loaded
+
+    def save(self, path: str):
+        """Write every entry, reviewed ones first, as JSON lines.
+
+        The file is written next to `path` and renamed over it, so readers
+        never see a half-written index.
+        """
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda entry: not entry["reviewed"])
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                record = {key: value for key, value in entry.items() if key != "features"}
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(temp_path, path)
+
+
+class AnswerRetrievalService:
+    """Serves reviewed answers for near-duplicate symptom descriptions.
+
+    New answers and review decisions are appended to ANSWER_INDEX_PATH.
+    Each worker process has its own index and, every
+    ANSWER_INDEX_REFRESH_SECONDS, applies the records other workers have
+    appended since, so a review made through one worker is served by all
+    of them shortly after. When the file holds far more records than the
+    index keeps (unreviewed answers dropped from the review queue), it is
+    compacted at startup.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('ANSWER_INDEX_ENABLED', 'false').lower() == 'true'
+        self.threshold = float(os.getenv('ANSWER_INDEX_THRESHOLD', '0.8'))
+        # Generated answers are only served once reviewed, unless auto review is on
+        self.auto_review = os.getenv('ANSWER_INDEX_AUTO_REVIEW', 'false').lower() == 'true'
+        self.index_path = os.getenv('ANSWER_INDEX_PATH', '')
+        self.max_pending = int(os.getenv('ANSWER_INDEX_MAX_PENDING', '1000'))
+        self.refresh_interval = float(os.getenv('ANSWER_INDEX_REFRESH_SECONDS', '30'))
+        self.index = AnswerIndex(max_pending=self.max_pending)
+
+        self._file_id = None
+        self._file_offset = 0
+        self._next_refresh = 0.0
+        self._refresh_lock = threading.Lock()
+
+        if self.enabled and self.index_path and os.path.exists(self.index_path):
+            try:
+                records = self._read_new_records()
+                logger.info("Loaded %s answers into the answer index", len(self.index))
+                if records > 2 * len(self.index) + 100:
+                    self._compact()
+            except Exception as e:
+                logger.error("Error loading answer index: %s", e)
+        self._next_refresh = time.monotonic() + self.refresh_interval
+
+    def _read_new_records(self) -> int:
+        """Apply the records appended to the index file since the last read.
+
+        Starts over with a fresh index when the file was replaced (compacted
+        by another worker). Returns the number of records applied.
+        """
+        with open(self.index_path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            file_id = (stat.st_dev, stat.st_ino)
+            index = self.index
+            if file_id != self._file_id or stat.st_size < self._file_offset:
+                index = AnswerIndex(max_pending=self.max_pending)
+                self._file_offset = 0
+            f.seek(self._file_offset)
+            data = f.read()
+
+        # A partially written last line is picked up on the next read
+        complete = data[:data.rfind(b"\n") + 1]
+        applied = 0
+        for line in complete.decode("utf-8").splitlines():
+            if line.strip():
+                index.apply_record(json.loads(line))
+                applied += 1
+
+        self._file_id = file_id
+        self._file_offset += len(complete)
+        self.index = index
+        return applied
+
+    def _compact(self):
+        self.index.save(self.index_path)
+        stat = os.stat(self.index_path)
+        self._file_id = (stat.st_dev, stat.st_ino)
+        self._file_offset = stat.st_size
+        logger.info("Compacted answer index file to %s entries", len(self.index))
+
+    def refresh(self):
+        """Pick up answers and reviews written by other workers, at most every refresh interval"""
+        if not self.index_path or time.monotonic() < self._next_refresh:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_refresh = time.monotonic() + self.refresh_interval
+            if os.path.exists(self.index_path):
+                self._read_new_records()
+        except Exception as e:
+            logger.warning("Failed to refresh answer index: %s", e)
+        finally:
+            self._refresh_lock.release()
+
+    def find_answer(self, symptoms: str, language: str, category: str) -> Optional[Dict]:
+        """Return a reviewed answer whose similarity is above the threshold"""
+        if not self.enabled:
+            return None
+
+        self.refresh()
+        match = self.index.lookup(symptoms, language, category)
+        if match and match["score"] >= self.threshold:
+            return match
+        return None
+
+    def record_answer(self, symptoms: str, language: str, category: str, answer: str) -> Optional[str]:
+        """Store an answer generated by the LLM"""
+        if not self.enabled:
+            return None
+
+        entry_id = self.index.add(symptoms, language, category, answer, reviewed=self.auto_review)
+        if entry_id is not None:
+            self._append_record({
+                "symptoms": symptoms,
+                "language": language,
+                "category": category,
+                "answer": answer,
+                "reviewed": self.auto_review
+            })
+        return entry_id
+
+    def review_answer(self, entry_id: str, reviewed: bool = True) -> Optional[Dict]:
+        """Approve (or withdraw) a stored answer so it can be served"""
+        entry = self.index.mark_reviewed(entry_id, reviewed)
+        if entry is not None:
+            # Replayed by load() and by the other workers' refresh
+            self._append_record({
+                "action": "review",
+                "symptoms": entry["symptoms"],
+                "language": entry["language"],
+                "category": entry["category"],
+                "reviewed": reviewed
+            })
+        return entry
+
+    def _append_record(self, record: Dict):
+        if not self.index_path:
+            return
+        try:
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except Exception as e:
+            logger.warning("Failed to persist answer index record: %s", e)
+
+# Create a global instance
+answer_retrieval_service = AnswerRetrievalService()
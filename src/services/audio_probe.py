@@ -0,0 +1,299 @@
+import os
+import struct
+from typing import BinaryIO, Dict, Optional
+
+# Bytes read from the start of a file to identify the container
+HEADER_SIZE = 64 * 1024
+# Bytes read from the end of an Ogg or WebM file to find the last page/cluster
+TAIL_SIZE = 64 * 1024
+
+# Matroska/WebM element IDs
+_EBML_DOC_TYPE = 0x4282
+_MKV_SEGMENT = 0x18538067
+_MKV_INFO = 0x1549A966
+_MKV_TIMECODE_SCALE = 0x2AD7B1
+_MKV_DURATION = 0x4489
+_MKV_TRACKS = 0x1654AE6B
+_MKV_CLUSTER = 0x1F43B675
+_MKV_CLUSTER_TIMECODE = 0xE7
+
+# MPEG audio bitrate (kbps) and sample rate tables, indexed by header fields
+_MP3_BITRATES = {
+    (3, 3): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (3, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (3, 1): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 3): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 1): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+}
+_MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def detect_format(header: bytes) -> Optional[str]:
+    """Identify the audio container from its magic bytes"""
+    if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+        return '.wav'
+    if header[:4] == b'fLaC':
+        return '.flac'
+    if header[:4] == b'OggS':
+        return '.ogg'
+    if header[:4] == b'\x1a\x45\xdf\xa3':
+        return '.webm'
+    if header[4:8] == b'ftyp':
+        return '.m4a'
+    if header[:3] == b'ID3' or (len(header) > 1 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0):
+        return '.mp3'
+    return None
+
+
+def _wav_info(header: bytes) -> Dict:
+    offset = 12
+    byte_rate = sample_rate = channels = None
+    while offset + 8 <= len(header):
+        chunk_id, chunk_size = struct.unpack_from('<4sI', header, offset)
+        body = offset + 8
+        if chunk_id == b'fmt ' and body + 16 <= len(header):
+            _, channels, sample_rate, byte_rate = struct.unpack_from('<HHII', header, body)
+        elif chunk_id == b'data':
+            if not byte_rate:
+                break
+            return {"duration": chunk_size / byte_rate, "sample_rate": sample_rate, "channels": channels}
+        offset = body + chunk_size + (chunk_size & 1)
+    raise ValueError("Malformed WAV header")
+
+
+def _flac_info(header: bytes) -> Dict:
+    # STREAMINFO is always the first metadata block
+    if len(header) < 42:
+        raise ValueError("Truncated FLAC header")
+    packed = int.from_bytes(header[18:26], 'big')
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x7) + 1
+    total_samples = packed & 0xFFFFFFFFF
+    if not sample_rate:
+        raise ValueError("Malformed FLAC header")
+    return {"duration": total_samples / sample_rate, "sample_rate": sample_rate, "channels": channels}
+
+
+def _ogg_info(header: bytes, stream: BinaryIO, size: int) -> Dict:
+    # The codec identification packet follows the first page's segment table
+    packet = 27 + header[26]
+    if header[packet:packet + 8] == b'OpusHead':
+        # Opus granule positions always count 48 kHz samples
+        channels, pre_skip, sample_rate = struct.unpack_from('<BHI', header, packet + 9)
+        codec, granule_rate = 'opus', 48000
+    elif header[packet:packet + 7] == b'\x01vorbis':
+        channels, sample_rate = struct.unpack_from('<BI', header, packet + 11)
+        codec, pre_skip, granule_rate = 'vorbis', 0, sample_rate
+    else:
+        raise ValueError("Unsupported Ogg codec")
+
+    stream.seek(max(0, size - TAIL_SIZE))
+    tail = stream.read(TAIL_SIZE)
+    last_page = tail.rfind(b'OggS')
+    if last_page < 0 or last_page + 14 > len(tail) or not granule_rate:
+        raise ValueError("Malformed Ogg stream")
+    granule = struct.unpack_from('<q', tail, last_page + 6)[0]
+    return {
+        "duration": max(0, granule - pre_skip) / granule_rate,
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "codec": codec
+    }
+
+
+def _read_vint(data: bytes, pos: int, keep_marker: bool = False):
+    """Read an EBML variable-length integer; returns (value, next position)"""
+    first = data[pos]
+    length = 9 - first.bit_length() if first else 9
+    if length > 8:
+        raise ValueError("Invalid EBML integer")
+    value = first if keep_marker else first & ((1 << (8 - length)) - 1)
+    for byte in data[pos + 1:pos + length]:
+        value = (value << 8) | byte
+    if pos + length > len(data):
+        raise ValueError("Truncated EBML integer")
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        value = None  # Unknown size, as written by live encoders such as MediaRecorder
+    return value, pos + length
+
+
+def _webm_info(header: bytes, stream: BinaryIO, size: int) -> Dict:
+    # EBML header, which names the document type
+    element_id, pos = _read_vint(header, 0, keep_marker=True)
+    ebml_size, pos = _read_vint(header, pos)
+    ebml_end = pos + (ebml_size or 0)
+    doc_type = b''
+    while pos < ebml_end:
+        element_id, pos = _read_vint(header, pos, keep_marker=True)
+        element_size, pos = _read_vint(header, pos)
+        if element_id == _EBML_DOC_TYPE:
+            doc_type = header[pos:pos + element_size]
+        pos += element_size or 0
+    if doc_type not in (b'webm', b'matroska'):
+        raise ValueError("Unsupported EBML document")
+
+    element_id, pos = _read_vint(header, ebml_end, keep_marker=True)
+    if element_id != _MKV_SEGMENT:
+        raise ValueError("Missing WebM segment")
+    _, pos = _read_vint(header, pos)
+
+    # Walk the segment children up to the first cluster
+    timecode_scale, duration, codec = 1000000, None, None
+    while pos < len(header):
+        element_id, pos = _read_vint(header, pos, keep_marker=True)
+        element_size, pos = _read_vint(header, pos)
+        if element_id == _MKV_CLUSTER or element_size is None:
+            break
+        body = header[pos:pos + element_size]
+        if element_id == _MKV_INFO:
+            child = 0
+            while child < len(body):
+                child_id, child = _read_vint(body, child, keep_marker=True)
+                child_size, child = _read_vint(body, child)
+                value = body[child:child + child_size]
+                if child_id == _MKV_TIMECODE_SCALE:
+                    timecode_scale = int.from_bytes(value, 'big')
+                elif child_id == _MKV_DURATION:
+                    duration = struct.unpack('>f' if child_size == 4 else '>d', value)[0]
+                child += child_size
+        elif element_id == _MKV_TRACKS:
+            codec = 'opus' if b'A_OPUS' in body else ('vorbis' if b'A_VORBIS' in body else None)
+        pos += element_size
+
+    if codec is None:
+        raise ValueError("Unsupported WebM audio codec")
+
+    if duration is None:
+        # Live recordings carry no Duration; use the start of the last cluster
+        stream.seek(max(0, size - TAIL_SIZE))
+        tail = stream.read(TAIL_SIZE)
+        cluster = tail.rfind(b'\x1f\x43\xb6\x75')
+        duration = 0
+        if cluster >= 0:
+            _, child = _read_vint(tail, cluster + 4)
+            if child < len(tail) and tail[child] == _MKV_CLUSTER_TIMECODE:
+                timecode_size, child = _read_vint(tail, child + 1)
+                duration = int.from_bytes(tail[child:child + timecode_size], 'big')
+
+    return {"duration": duration * timecode_scale / 1e9, "codec": codec}
+
+
+def _mp4_info(stream: BinaryIO, size: int) -> Dict:
+    # Walk the top-level boxes to moov, then read mvhd; moov may sit at the end
+    offset = 0
+    while offset + 8 <= size:
+        stream.seek(offset)
+        box_size, box_type = struct.unpack('>I4s', stream.read(8))
+        header_size = 8
+        if box_size == 1:
+            box_size = struct.unpack('>Q', stream.read(8))[0]
+            header_size = 16
+        elif box_size == 0:
+            box_size = size - offset
+        if box_size < header_size:
+            break
+
+        if box_type == b'moov':
+            moov = stream.read(min(box_size - header_size, HEADER_SIZE))
+            position = moov.find(b'mvhd')
+            if position < 4:
+                break
+            body = position + 4
+            if moov[body] == 1:
+                timescale, duration = struct.unpack_from('>IQ', moov, body + 20)
+            else:
+                timescale, duration = struct.unpack_from('>II', moov, body + 12)
+            if not timescale:
+                break
+            return {"duration": duration / timescale}
+        offset += box_size
+    raise ValueError("Malformed MP4 container")
+
+
+def _mp3_info(header: bytes, stream: BinaryIO, size: int) -> Dict:
+    base, offset = 0, 0
+    if header[:3] == b'ID3' and len(header) >= 10:
+        tag_size = ((header[6] & 0x7F) << 21) | ((header[7] & 0x7F) << 14) | ((header[8] & 0x7F) << 7) | (header[9] & 0x7F)
+        offset = 10 + tag_size
+        if offset + 4 > len(header):
+            # Large tags (cover art) push the first frame past the header read
+            stream.seek(offset)
+            header = stream.read(HEADER_SIZE)
+            base, offset = offset, 0
+
+    # Find the first valid frame header within what has been read
+    while offset + 4 <= len(header):
+        b1, b2, b3 = header[offset + 1], header[offset + 2], header[offset + 3]
+        version, layer = (b1 >> 3) & 0x3, (b1 >> 1) & 0x3
+        bitrate_index, rate_index = b2 >> 4, (b2 >> 2) & 0x3
+        if (header[offset] == 0xFF and b1 & 0xE0 == 0xE0 and version != 1 and layer != 0
+                and 0 < bitrate_index < 15 and rate_index < 3):
+            break
+        offset += 1
+    else:
+        raise ValueError("No MPEG audio frame found")
+
+    table_version = 3 if version == 3 else 2
+    bitrate = _MP3_BITRATES[(table_version, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    channels = 1 if (b3 >> 6) == 3 else 2
+    samples_per_frame = 384 if layer == 3 else (1152 if version == 3 or layer == 2 else 576)
+
+    # A Xing/Info header carries the exact frame count of VBR files
+    for marker in (b'Xing', b'Info'):
+        position = header.find(marker, offset, offset + 64)
+        if position >= 0 and position + 12 <= len(header):
+            flags = struct.unpack_from('>I', header, position + 4)[0]
+            if flags & 0x1:
+                frames = struct.unpack_from('>I', header, position + 8)[0]
+                return {"duration": frames * samples_per_frame / sample_rate,
+                        "sample_rate": sample_rate, "channels": channels}
+
+    return {"duration": (size - base - offset) * 8 / bitrate, "sample_rate": sample_rate, "channels": channels}
+
+
+def probe_audio(stream: BinaryIO, size: Optional[int] = None) -> Dict:
+    """Identify an audio file and read its duration from the headers only.
+
+    Nothing is decoded: at most the first and last 64 KB of the stream are
+    read, so junk uploads are rejected without spawning ffmpeg. The stream is
+    rewound to the start afterwards.
+    """
+    try:
+        if size is None:
+            stream.seek(0, os.SEEK_END)
+            size = stream.tell()
+        stream.seek(0)
+
+        header = stream.read(HEADER_SIZE)
+        audio_format = detect_format(header)
+        if audio_format is None:
+            return {"valid": False, "error": "Unrecognized audio format"}
+
+        try:
+            if audio_format == '.wav':
+                info = _wav_info(header)
+            elif audio_format == '.flac':
+                info = _flac_info(header)
+            elif audio_format == '.ogg':
+                info = _ogg_info(header, stream, size)
+            elif audio_format == '.webm':
+                info = _webm_info(header, stream, size)
+            elif audio_format == '.m4a':
+                info = _mp4_info(stream, size)
+            else:
+                info = _mp3_info(header, stream, size)
+        except (ValueError, struct.error, IndexError, KeyError) as e:
+            return {"valid": False, "format": audio_format, "error": f"Invalid audio file: {str(e)}"}
+
+        info.update({"valid": True, "format": audio_format, "file_size": size})
+        return info
+    finally:
+        stream.seek(0)
+
+
+def probe_audio_file(file_path: str) -> Dict:
+    """Probe an audio file on disk"""
+    with open(file_path, 'rb') as f:
+        return probe_audio(f, os.path.getsize(file_path))
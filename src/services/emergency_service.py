@@ -0,0 +1,165 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+from dotenv import load_dotenv
+from src.services.translation_service import LRUCache
+from src.services.llm_service import llm_service
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# National helplines shown with every emergency response
+EMERGENCY_HELPLINES = [
+    {"name": "Ambulance", "number": "108"},
+    {"name": "Emergency", "number": "112"},
+    {"name": "Tele-MANAS (mental health)", "number": "14416"}
+]
+
+# Localized emergency guidance for every supported language
+EMERGENCY_MESSAGES = {
+    "en": {
+        "title": "This may be a medical emergency",
+        "message": "Your symptoms may need urgent medical care. Call 108 for an ambulance or 112 for emergency help, and go to the nearest hospital now. Do not wait for the symptoms to get better.",
+        "actions": [
+            "Call 108 (ambulance) or 112 (emergency) now",
+            "Go to the nearest hospital or doctor immediately",
+            "Do not stay alone - ask someone to help you"
+        ]
+    },
+    "hi": {
+        "title": "यह एक मेडिकल इमरजेंसी हो सकती है",
+        "message": "आपके लक्षणों को तुरंत इलाज की ज़रूरत हो सकती है। एम्बुलेंस के लिए 108 या आपातकालीन सहायता के लिए 112 पर अभी कॉल करें और तुरंत नज़दीकी अस्पताल जाएं। लक्षणों के ठीक होने का इंतज़ार न करें।",
+        "actions": [
+            "अभी 108 (एम्बुलेंस) या 112 (आपातकाल) पर कॉल करें",
+            "तुरंत नज़दीकी अस्पताल या डॉक्टर के पास जाएं",
+            "अकेले न रहें - किसी को मदद के लिए बुलाएं"
+        ]
+    },
+    "ta": {
+        "title": "இது மருத்துவ அவசரநிலையாக இருக்கலாம்",
+        "message": "உங்கள் அறிகுறிகளுக்கு உடனடி மருத்துவ சிகிச்சை தேவைப்படலாம். ஆம்புலன்ஸுக்கு 108 அல்லது அவசர உதவிக்கு 112 ஐ இப்போதே அழைத்து, அருகிலுள்ள மருத்துவமனைக்கு உடனே செல்லுங்கள். அறிகுறிகள் சரியாகும் வரை காத்திருக்க வேண்டாம்.",
+        "actions": [
+            "இப்போதே 108 (ஆம்புலன்ஸ்) அல்லது 112 (அவசரம்) ஐ அழைக்கவும்",
+            "உடனே அருகிலுள்ள மருத்துவமனை அல்லது மருத்துவரிடம் செல்லுங்கள்",
+            "தனியாக இருக்க வேண்டாம் - உதவிக்கு யாரையாவது அழைக்கவும்"
+        ]
+    },
+    "bn": {
+        "title": "এটি একটি মেডিকেল জরুরি অবস্থা হতে পারে",
+        "message": "আপনার উপসর্গগুলির জন্য জরুরি চিকিৎসার প্রয়োজন হতে পারে। অ্যাম্বুলেন্সের জন্য 108 অথবা জরুরি সাহায্যের জন্য 112 নম্বরে এখনই কল করুন এবং অবিলম্বে নিকটতম হাসপাতালে যান। উপসর্গ ভালো হওয়ার জন্য অপেক্ষা করবেন না।",
+        "actions": [
+            "এখনই 108 (অ্যাম্বুলেন্স) বা 112 (জরুরি) নম্বরে কল করুন",
+            "অবিলম্বে নিকটতম হাসপাতাল বা ডাক্তারের কাছে যান",
+            "একা থাকবেন না - সাহায্যের জন্য কাউকে ডাকুন"
+        ]
+    },
+    "te": {
+        "title": "ఇది వైద్య అత్యవసర పరిస్థితి కావచ్చు",
+        "message": "మీ లక్షణాలకు తక్షణ వైద్య సహాయం అవసరం కావచ్చు. అంబులెన్స్ కోసం 108 లేదా అత్యవసర సహాయం కోసం 112 కు ఇప్పుడే కాల్ చేసి, వెంటనే దగ్గరలోని ఆసుపత్రికి వెళ్ళండి. లక్షణాలు తగ్గే వరకు వేచి ఉండకండి.",
+        "actions": [
+            "ఇప్పుడే 108 (అంబులెన్స్) లేదా 112 (అత్యవసరం) కు కాల్ చేయండి",
+            "వెంటనే దగ్గరలోని ఆసుపత్రికి లేదా డాక్టర్ వద్దకు వెళ్ళండి",
+            "ఒంటరిగా ఉండకండి - సహాయం కోసం ఎవరినైనా పిలవండి"
+        ]
+    },
+    "mr": {
+        "title": "ही वैद्यकीय आणीबाणी असू शकते",
+        "message": "तुमच्या लक्षणांसाठी तातडीच्या वैद्यकीय उपचारांची गरज असू शकते. रुग्णवाहिकेसाठी 108 किंवा आपत्कालीन मदतीसाठी 112 वर आत्ताच कॉल करा आणि लगेच जवळच्या रुग्णालयात जा. लक्षणे बरी होण्याची वाट पाहू नका.",
+        "actions": [
+            "आत्ताच 108 (रुग्णवाहिका) किंवा 112 (आपत्कालीन) वर कॉल करा",
+            "लगेच जवळच्या रुग्णालयात किंवा डॉक्टरकडे जा",
+            "एकटे राहू नका - मदतीसाठी कोणालातरी बोलवा"
+        ]
+    },
+    "gu": {
+        "title": "આ તબીબી કટોકટી હોઈ શકે છે",
+        "message": "તમારા લક્ષણો માટે તાત્કાલિક તબીબી સારવારની જરૂર પડી શકે છે. એમ્બ્યુલન્સ માટે 108 અથવા કટોકટી મદદ માટે 112 પર હમણાં જ કૉલ કરો અને તરત જ નજીકની હોસ્પિટલમાં જાઓ. લક્ષણો સારા થવાની રાહ ન જુઓ.",
+        "actions": [
+            "હમણાં જ 108 (એમ્બ્યુલન્સ) અથવા 112 (કટોકટી) પર કૉલ કરો",
+            "તરત જ નજીકની હોસ્પિટલ અથવા ડૉક્ટર પાસે જાઓ",
+            "એકલા ન રહો - મદદ માટે કોઈને બોલાવો"
+        ]
+    },
+    "kn": {
+        "title": "ಇದು ವೈದ್ಯಕೀಯ ತುರ್ತು ಪರಿಸ್ಥಿತಿ ಆಗಿರಬಹುದು",
+        "message": "ನಿಮ್ಮ ರೋಗಲಕ್ಷಣಗಳಿಗೆ ತಕ್ಷಣದ ವೈದ್ಯಕೀಯ ಚಿಕಿತ್ಸೆ ಬೇಕಾಗಬಹುದು. ಆಂಬ್ಯುಲೆನ್ಸ್‌ಗಾಗಿ 108 ಅಥವಾ ತುರ್ತು ಸಹಾಯಕ್ಕಾಗಿ 112 ಗೆ ಈಗಲೇ ಕರೆ ಮಾಡಿ ಮತ್ತು ತಕ್ಷಣ ಹತ್ತಿರದ ಆಸ್ಪತ್ರೆಗೆ ಹೋಗಿ. ರೋಗಲಕ್ಷಣಗಳು ಕಡಿಮೆಯಾಗುವವರೆಗೆ ಕಾಯಬೇಡಿ.",
+        "actions": [
+            "ಈಗಲೇ 108 (ಆಂಬ್ಯುಲೆನ್ಸ್) ಅಥವಾ 112 (ತುರ್ತು) ಗೆ ಕರೆ ಮಾಡಿ",
+            "ತಕ್ಷಣ ಹತ್ತಿರದ ಆಸ್ಪತ್ರೆ ಅಥವಾ ವೈದ್ಯರ ಬಳಿ ಹೋಗಿ",
+            "ಒಬ್ಬರೇ ಇರಬೇಡಿ - ಸಹಾಯಕ್ಕಾಗಿ ಯಾರನ್ನಾದರೂ ಕರೆಯಿರಿ"
+        ]
+    }
+}
+
+
+class EmergencyService:
+    """Instant, precomputed guidance for high-severity symptoms.
+
+    The LLM elaboration, when requested, runs on a small thread pool after the
+    emergency response has been returned and is collected by request ID.
+    Elaborations live in this worker process only: with several gunicorn
+    workers a poll that lands on another worker gets a 404, so run one
+    worker or route polls back to the same one (e.g. sticky sessions).
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('EMERGENCY_FAST_PATH', 'true').lower() == 'true'
+        self.elaborate_by_default = os.getenv('EMERGENCY_ELABORATION', 'true').lower() == 'true'
+        self.latency_slo_ms = float(os.getenv('EMERGENCY_LATENCY_SLO_MS', '20'))
+        self.executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('EMERGENCY_ELABORATION_WORKERS', '2')),
+            thread_name_prefix="emergency-elaboration"
+        )
+        self.elaborations = LRUCache(int(os.getenv('EMERGENCY_ELABORATION_CACHE_SIZE', '256')))
+
+        # Build every localized response once, so serving one is a dict lookup
+        self.responses = {
+            language: self._build_response(content)
+            for language, content in EMERGENCY_MESSAGES.items()
+        }
+
+    def _build_response(self, content: Dict) -> Dict:
+        actions = "\n".join(f"* {action}" for action in content["actions"])
+        return {
+            "analysis": f"**{content['title']}**\n\n{content['message']}\n\n{actions}",
+            "title": content["title"],
+            "message": content["message"],
+            "actions": content["actions"],
+            "helplines": EMERGENCY_HELPLINES
+        }
+
+    def get_response(self, language: str) -> Dict:
+        """Get the precomputed emergency response for a language"""
+        return self.responses.get(language, self.responses["en"])
+
+    def start_elaboration(self, request_id: str, symptoms: str, language: str):
+        """Generate the LLM analysis out of band for a fast-path response"""
+        self.elaborations.set(request_id, {"status": "pending"})
+
+        def run():
+            try:
+                result = llm_service.analyze_symptoms(symptoms, language)
+                if result.get('success', False):
+                    self.elaborations.set(request_id, {
+                        "status": "completed",
+                        "analysis": result['analysis'],
+                        "condition_category": result.get('condition_category', 'general')
+                    })
+                else:
+                    self.elaborations.set(request_id, {
+                        "status": "failed",
+                        "error": result.get('error', 'Analysis failed')
+                    })
+            except Exception as e:
+                logger.error("Error in emergency elaboration: %s", e)
+                self.elaborations.set(request_id, {"status": "failed", "error": str(e)})
+
+        self.executor.submit(run)
+
+    def get_elaboration(self, request_id: str) -> Optional[Dict]:
+        return self.elaborations.get(request_id)
+
+# Create a global instance
+emergency_service = EmergencyService()
@@ -0,0 +1,99 @@
+import re
+import threading
+from collections import deque
+from typing import Dict, Tuple
+
+# Indic scripts take several tokens per word with Llama-style tokenizers, so an
+# answer of the same length needs a much larger budget than in English
+DEFAULT_LANGUAGE_BUDGETS = {
+    "en": 350,
+    "hi": 700,
+    "ta": 800,
+    "bn": 700,
+    "te": 800,
+    "mr": 700,
+    "gu": 700,
+    "kn": 800
+}
+
+# Rough characters per token, used when the API does not report usage
+_CHARS_PER_TOKEN = {"en": 4.0}
+_INDIC_CHARS_PER_TOKEN = 1.5
+
+# Sentence ends in English and the Indic scripts (danda)
+_SENTENCE_END = re.compile(r"[.!?।॥](?:\*\*)?\s")
+
+
+def estimate_tokens(text: str, language: str) -> int:
+    """Approximate token count of generated text"""
+    return max(1, round(len(text) / _CHARS_PER_TOKEN.get(language, _INDIC_CHARS_PER_TOKEN)))
+
+
+def trim_incomplete(text: str) -> str:
+    """Drop a trailing, cut-off sentence from a truncated generation.
+
+    Cuts at the last line break or sentence end in the second half of the
+    text; shorter texts are returned unchanged rather than gutted.
+    """
+    stripped = text.rstrip()
+    cut = stripped.rfind("\n")
+    for match in _SENTENCE_END.finditer(stripped + " "):
+        cut = max(cut, match.end() - 1)
+    if cut >= len(stripped) // 2:
+        return stripped[:cut].rstrip()
+    return stripped
+
+
+class GenerationBudget:
+    """Per-(category, language) max_tokens derived from recorded output lengths.
+
+    Until a key has `min_samples` completed answers it uses the language
+    default; after that the budget is the `percentile` of recent output
+    lengths times `headroom`, clamped to [min_tokens, max_tokens].
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20, percentile: float = 0.95,
+                 headroom: float = 1.15, min_tokens: int = 150, max_tokens: int = 1024):
+        self.window = window
+        self.min_samples = min_samples
+        self.percentile = percentile
+        self.headroom = headroom
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+        self._samples: Dict[Tuple[str, str], deque] = {}
+        self._lock = threading.Lock()
+
+    def default_budget(self, language: str) -> int:
+        return DEFAULT_LANGUAGE_BUDGETS.get(language, DEFAULT_LANGUAGE_BUDGETS["hi"])
+
+    def get_budget(self, category: str, language: str) -> int:
+        with self._lock:
+            samples = self._samples.get((category, language))
+            ordered = sorted(samples) if samples and len(samples) >= self.min_samples else None
+
+        if ordered is None:
+            budget = self.default_budget(language)
+        else:
+            budget = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))] * self.headroom
+        return int(min(self.max_tokens, max(self.min_tokens, budget)))
+
+    def record(self, category: str, language: str, tokens: int):
+        """Record the length of an answer that finished on its own"""
+        with self._lock:
+            samples = self._samples.get((category, language))
+            if samples is None:
+                samples = self._samples[(category, language)] = deque(maxlen=self.window)
+            samples.append(tokens)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            keys = list(self._samples)
+            counts = {f"{category}/{language}": len(self._samples[(category, language)])
+                      for category, language in keys}
+        return {
+            "samples": counts,
+            "budgets": {
+                f"{category}/{language}": self.get_budget(category, language)
+                for category, language in keys
+            }
+        }
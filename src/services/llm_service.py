@@ -1,20 +1,41 @@
 # In src/services/llm_service.py
 
 import os
+import copy
+import logging
+from typing import Optional
+import requests
 from dotenv import load_dotenv
-from huggingface_hub import InferenceClient
+from huggingface_hub import InferenceClient, InferenceTimeoutError
+from src.services.translation_service import translation_service, LRUCache
+from src.services.answer_index import answer_retrieval_service
+from src.services.generation_budget import GenerationBudget, estimate_tokens, trim_incomplete
+from src.traffic_capture import trace_stage
+from src.deadline import Deadline, DeadlineExceeded
 
 # Load the .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# The model is asked to close every answer with this marker after the
+# disclaimer; it doubles as a stop sequence so nothing is generated past it
+END_MARKER = "[END]"
+
+# huggingface_hub converts only builtin TimeoutError; read timeouts from the
+# requests session it uses surface as requests' own Timeout
+TIMEOUT_ERRORS = (DeadlineExceeded, InferenceTimeoutError, TimeoutError, requests.exceptions.Timeout)
+
 class LLMService:
     def __init__(self):
         # --- Setup for Hugging Face API ---
         hf_token = os.getenv('HUGGING_FACE_TOKEN')
         if not hf_token:
-            print("FATAL ERROR: HUGGING_FACE_TOKEN not found.")
+            logger.critical("HUGGING_FACE_TOKEN not found")
         
-        self.client = InferenceClient(token=hf_token)
+        # Upper bound for any single call; a request deadline can only shorten it
+        self.timeout = float(os.getenv('LLM_TIMEOUT', '60'))
+        self.client = InferenceClient(token=hf_token, timeout=self.timeout)
         self.model_id = "meta-llama/Meta-Llama-3-8B-Instruct"
 
         # --- Your excellent, detailed prompts ---
@@ -39,6 +60,31 @@ class LLMService:
             # Add your other languages here
         }
 
+        # --- Pivot-language mode ---
+        # When LLM_PIVOT_LANGUAGE is set, the analysis is generated once in the pivot
+        # language, cached, and translated into the requested language.
+        self.pivot_language = os.getenv('LLM_PIVOT_LANGUAGE', '').strip() or None
+        self.translation_service = translation_service
+        if self.pivot_language and self.translation_service.backend.name == "local":
+            logger.warning(
+                "LLM_PIVOT_LANGUAGE=%s with the local translation backend: answers will be served "
+                "untranslated; set TRANSLATION_BACKEND=huggingface", self.pivot_language
+            )
+        self.generation_cache = LRUCache(int(os.getenv('LLM_GENERATION_CACHE_SIZE', '512')))
+
+        # --- Near-duplicate answer retrieval ---
+        self.answer_retrieval = answer_retrieval_service
+
+        # --- Generation length control ---
+        self.generation_budget = GenerationBudget(
+            min_samples=int(os.getenv('LLM_BUDGET_MIN_SAMPLES', '20')),
+            max_tokens=int(os.getenv('LLM_MAX_TOKENS_CAP', '1024'))
+        )
+        self.max_continuations = int(os.getenv('LLM_MAX_CONTINUATIONS', '1'))
+        self.continuation_tokens = int(os.getenv('LLM_CONTINUATION_TOKENS', '200'))
+        # Continuations are skipped when less than this is left of the request deadline
+        self.continuation_min_seconds = float(os.getenv('LLM_CONTINUATION_MIN_SECONDS', '2'))
+
     def detect_condition_category(self, symptoms: str) -> str:
         """Your function to detect the primary condition category from symptoms"""
         symptoms_lower = symptoms.lower()
@@ -56,8 +102,12 @@ class LLMService:
             
         return "general"
 
-    def analyze_symptoms(self, symptoms: str, language: str = "en") -> dict:
-        """Analyze symptoms using your detailed prompts and the Hugging Face LLM"""
+    def analyze_symptoms(self, symptoms: str, language: str = "en", deadline: Optional[Deadline] = None) -> dict:
+        """Analyze symptoms using your detailed prompts and the Hugging Face LLM.
+
+        With a deadline, every LLM call gets only the time that is left, and
+        running out of time returns a result with "timed_out" set.
+        """
         system_prompt = """
 ## YOUR IDENTITY (PERSONA)
 You are 'Aarogya Sahayak'. You are not just an AI; you are like an experienced and trusted community health advisor from a village in India. You are calm, caring, and you speak very simple, pure Hindi so that anyone can understand you.
@@ -109,34 +159,54 @@ You MUST generate your response by filling in the blanks of this exact template.
 **५. महत्वपूर्ण चेतावनी (Disclaimer):**
 यह सलाह केवल जानकारी के लिए है और डॉक्टर का इलाज नहीं है। अपनी सेहत के लिए हमेशा एक योग्य डॉक्टर से ही सलाह लें।
 """
+        condition_category = "general"
         try:
             # 1. Use your function to detect the category
             condition_category = self.detect_condition_category(symptoms)
-            
-            # 2. Get the specialized system prompt for that category
-            system_prompt = self.disease_prompts.get(condition_category, self.disease_prompts["general"])
-            
-            # 3. Get the instruction for the language
-            language_instruction = self.language_instructions.get(language, self.language_instructions["en"])
-            
-            # 4. Construct the full prompt for the AI
-            full_prompt = f"{system_prompt}\n\n{language_instruction}\n\nStrictly follow these instructions and provide a helpful, safe response."
-            
-            # 5. Create the message payload for Hugging Face
-            messages = [
-                {"role": "system", "content": full_prompt},
-                {"role": "user", "content": f"My symptoms are: {symptoms}"}
-            ]
 
-            # 6. Make the API call
-            response = self.client.chat_completion(
-                messages=messages,
-                model=self.model_id,
-                max_tokens=500,
-                temperature=0.4,
-            )
+            # 2. Serve a reviewed answer for a near-duplicate description if there is one
+            match = self.answer_retrieval.find_answer(symptoms, language, condition_category)
+            if match:
+                return {
+                    "success": True,
+                    "analysis": match["answer"],
+                    "condition_category": condition_category,
+                    "retrieval": {
+                        "entry_id": match["entry_id"],
+                        "score": match["score"]
+                    }
+                }
+
+            # 3. In pivot mode, generate (or reuse) the pivot analysis and translate it
+            if self.pivot_language:
+                pivot_text = self._generate_pivot_analysis(symptoms, condition_category, deadline)
+                try:
+                    analysis_text = self.translation_service.translate(
+                        pivot_text, self.pivot_language, language, deadline
+                    )
+                except Exception as e:
+                    if not isinstance(e, TIMEOUT_ERRORS) and (deadline is None or not deadline.expired()):
+                        raise
+                    # Out of time: the untranslated analysis beats none at all
+                    logger.warning("Translation ran out of time: %s", e)
+                    return {
+                        "success": True,
+                        "analysis": pivot_text,
+                        "condition_category": condition_category,
+                        "pivot_language": self.pivot_language,
+                        "degraded": True
+                    }
+                self.answer_retrieval.record_answer(symptoms, language, condition_category, analysis_text)
+
+                return {
+                    "success": True,
+                    "analysis": analysis_text,
+                    "condition_category": condition_category,
+                    "pivot_language": self.pivot_language
+                }
 
-            analysis_text = response.choices[0].message.content
+            analysis_text = self._generate_analysis(symptoms, language, condition_category, deadline)
+            self.answer_retrieval.record_answer(symptoms, language, condition_category, analysis_text)
 
             return {
                 "success": True,
@@ -145,9 +215,123 @@ You MUST generate your response by filling in the blanks of this exact template.
             }
 
         except Exception as e:
-            print(f"--- !!! HUGGING FACE API FAILED !!! ---")
-            print(f"ERROR: {e}")
+            if isinstance(e, TIMEOUT_ERRORS) or (deadline is not None and deadline.expired()):
+                logger.warning("Hugging Face API call ran out of time: %s", e)
+                return {
+                    "success": False,
+                    "timed_out": True,
+                    "error": "The AI service did not respond in time.",
+                    "condition_category": condition_category
+                }
+            logger.error("Hugging Face API call failed: %s", e)
             return {"success": False, "error": "Failed to get a response from the AI service."}
 
+    def _generate_analysis(self, symptoms: str, language: str, condition_category: str,
+                           deadline: Optional[Deadline] = None) -> str:
+        """Generate the analysis text with the LLM in the given language"""
+        # Get the specialized system prompt for that category
+        system_prompt = self.disease_prompts.get(condition_category, self.disease_prompts["general"])
+
+        # Get the instruction for the language
+        language_instruction = self.language_instructions.get(language, self.language_instructions["en"])
+
+        # Construct the full prompt for the AI
+        full_prompt = (
+            f"{system_prompt}\n\n{language_instruction}\n\n"
+            "Strictly follow these instructions and provide a helpful, safe response. "
+            f"End with the medical disclaimer, then write {END_MARKER} on its own line."
+        )
+
+        # Create the message payload for Hugging Face
+        messages = [
+            {"role": "system", "content": full_prompt},
+            {"role": "user", "content": f"My symptoms are: {symptoms}"}
+        ]
+
+        max_tokens = self.generation_budget.get_budget(condition_category, language)
+        text, tokens, finish_reason = self._complete(messages, max_tokens, language, deadline)
+        total_tokens = tokens
+        continuations = 0
+
+        # A cut-off answer gets a bounded number of short continuation calls,
+        # as long as the deadline leaves time for them
+        while (finish_reason == "length" and continuations < self.max_continuations
+               and (deadline is None or deadline.remaining() >= self.continuation_min_seconds)):
+            continuations += 1
+            continuation_messages = messages + [
+                {"role": "assistant", "content": text},
+                {"role": "user", "content": "Continue exactly where you stopped, without repeating anything."}
+            ]
+            try:
+                more, tokens, finish_reason = self._complete(
+                    continuation_messages, self.continuation_tokens, language, deadline
+                )
+            except Exception as e:
+                if not isinstance(e, TIMEOUT_ERRORS) and (deadline is None or not deadline.expired()):
+                    raise
+                # Keep the part we have; it is trimmed to complete sentences below
+                logger.warning("Continuation ran out of time: %s", e)
+                break
+            separator = "" if text[-1:].isspace() or more[:1].isspace() else " "
+            text = f"{text}{separator}{more}"
+            total_tokens += tokens
+
+        if finish_reason == "length":
+            text = trim_incomplete(text)
+        else:
+            # Only answers that ended on their own say how long a full answer is
+            self.generation_budget.record(condition_category, language, total_tokens)
+
+        logger.info(
+            "Generated %s tokens (budget %s, %s continuations, finish %s)",
+            total_tokens, max_tokens, continuations, finish_reason,
+            extra={
+                "category": condition_category,
+                "language": language,
+                "completion_tokens": total_tokens,
+                "max_tokens": max_tokens,
+                "continuations": continuations,
+                "finish_reason": finish_reason
+            }
+        )
+        return text.strip()
+
+    def _complete(self, messages: list, max_tokens: int, language: str,
+                  deadline: Optional[Deadline] = None) -> tuple:
+        """One chat completion call; returns (text, completion tokens, finish reason)"""
+        client = self.client
+        if deadline is not None:
+            deadline.check("llm")
+            # A copy, so concurrent requests do not change each other's timeout
+            client = copy.copy(self.client)
+            client.timeout = deadline.timeout(self.timeout)
+
+        with trace_stage("llm"):
+            response = client.chat_completion(
+                messages=messages,
+                model=self.model_id,
+                max_tokens=max_tokens,
+                temperature=0.4,
+                stop=[END_MARKER],
+            )
+
+        choice = response.choices[0]
+        text = choice.message.content or ""
+        # Some backends return the matched stop sequence as part of the text
+        text = text.split(END_MARKER, 1)[0]
+        usage = getattr(response, "usage", None)
+        tokens = getattr(usage, "completion_tokens", None) or estimate_tokens(text, language)
+        return text, tokens, getattr(choice, "finish_reason", None)
+
+    def _generate_pivot_analysis(self, symptoms: str, condition_category: str,
+                                 deadline: Optional[Deadline] = None) -> str:
+        """Generate the analysis in the pivot language, reusing cached generations"""
+        key = (self.pivot_language, condition_category, " ".join(symptoms.lower().split()))
+        analysis_text = self.generation_cache.get(key)
+        if analysis_text is None:
+            analysis_text = self._generate_analysis(symptoms, self.pivot_language, condition_category, deadline)
+            self.generation_cache.set(key, analysis_text)
+        return analysis_text
+
 # Create a single instance of the service
 llm_service = LLMService()
@@ -1,17 +1,94 @@
 import os
+import re
+import copy
+import subprocess
 import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 import speech_recognition as sr
 from pydub import AudioSegment
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+from src.services.audio_probe import probe_audio_file
+from src.traffic_capture import trace_stage
+from src.deadline import Deadline, DeadlineExceeded
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Unicode block of the script each Indian language is written in; English is
+# scored on known words instead. Used to rank auto-detect candidates.
+LANGUAGE_SCRIPTS = {
+    "hi": (0x0900, 0x097F),
+    "mr": (0x0900, 0x097F),
+    "bn": (0x0980, 0x09FF),
+    "gu": (0x0A80, 0x0AFF),
+    "ta": (0x0B80, 0x0BFF),
+    "te": (0x0C00, 0x0C7F),
+    "kn": (0x0C80, 0x0CFF)
+}
+
+# Common English words and symptom vocabulary. Romanized Hindi returned by
+# en-US ("mujhe do din se bukhar hai") is ASCII too, but few of its words
+# are English, so the share of known words tells the two apart.
+ENGLISH_WORDS = frozenset("""
+a about after again ago all also am an and any are as at back bad be been before being
+but by can cannot cant can't could day days did do does doing dont don't down during each
+eat eating every feel feeling feels few for from get getting go going got had has have
+having he her him his how i i'm im in is it its it's just keep last little lot many me
+more morning most much my night no not now of off on once one only or other our out over
+past please really right same see she since so some still such take taking than that the
+their them then there these they this those three through time to today too two under
+until up very was we week weeks were what when where which while who why will with within
+without would yes yesterday you your
+ache aches aching allergy appetite arm back belly bleeding blood body bone breath breathe
+breathing burning chest chills cold constipation cough coughing cramps diarrhea dizziness
+dizzy ear ears eye eyes face fatigue fever headache head heart high hurt hurts itching itchy
+joint joints leg legs loose low medicine mild motion motions mouth muscle nausea neck nose
+pain painful pains pressure rash runny severe shoulder sick skin sleep sneezing sore
+stomach sugar swelling temperature throat tired tiredness tooth toothache urine vomit
+vomiting weak weakness wheezing
+""".split())
+# Share of known words at which an English transcript scores fully
+_ENGLISH_FULL_SCORE = 0.6
+_WORD_PATTERN = re.compile(r"[a-z']+")
+
+
+def script_match(text: str, language: str) -> float:
+    """How well a transcript fits language, from 0 to 1.
+
+    For Indian languages, the fraction of letters in the language's script.
+    For English, the share of words that are common English words, scaled
+    so ordinary sentences reach 1.0 while romanized Indian speech does not.
+    """
+    if language in LANGUAGE_SCRIPTS:
+        letters = [ch for ch in text if ch.isalpha()]
+        if not letters:
+            return 0.0
+        low, high = LANGUAGE_SCRIPTS[language]
+        return sum(1 for ch in letters if low <= ord(ch) <= high) / len(letters)
+
+    words = _WORD_PATTERN.findall(text.lower())
+    if not words:
+        return 0.0
+    known = sum(1 for word in words if word in ENGLISH_WORDS)
+    return min(1.0, known / len(words) / _ENGLISH_FULL_SCORE)
+
+
+def _timed_out_result() -> Dict:
+    return {
+        "success": False,
+        "timed_out": True,
+        "error": "Speech recognition did not finish in time",
+        "text": "",
+        "confidence": 0.0
+    }
+
 class SpeechService:
     def __init__(self):
         self.recognizer = sr.Recognizer()
+        # Upper bound for any single recognition call; a request deadline can only shorten it
+        self.timeout = float(os.getenv('SPEECH_RECOGNITION_TIMEOUT', '30'))
+        self.recognizer.operation_timeout = self.timeout
         
         # Language mapping for speech recognition
         self.language_codes = {
@@ -26,50 +103,81 @@ class SpeechService:
         }
         
         # Supported audio formats
-        self.supported_formats = ['.wav', '.mp3', '.m4a', '.ogg', '.flac']
+        self.supported_formats = ['.wav', '.mp3', '.m4a', '.ogg', '.flac', '.webm', '.opus']
+
+        # Opus clips are decoded straight to PCM at the rate the recognizer uses
+        self.pcm_sample_rate = 16000
+
+        # Auto mode: recognize a few candidate languages at once and keep the best
+        self.auto_languages = [
+            language.strip()
+            for language in os.getenv('SPEECH_AUTO_LANGUAGES', 'hi,en').split(',')
+            if language.strip() in self.language_codes
+        ]
+        self.auto_max_candidates = int(os.getenv('SPEECH_AUTO_MAX_CANDIDATES', '3'))
+        self.auto_clear_score = float(os.getenv('SPEECH_AUTO_CLEAR_SCORE', '0.85'))
+        self.auto_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('SPEECH_AUTO_WORKERS', '6')),
+            thread_name_prefix="speech-auto"
+        )
 
-    def convert_audio_to_wav(self, audio_file_path: str) -> str:
-        """Convert audio file to WAV format for speech recognition"""
+    def convert_audio_to_wav(self, audio_file_path: str, deadline: Optional[Deadline] = None) -> str:
+        """Convert audio file to WAV format for speech recognition.
+
+        ffmpeg runs as a subprocess with the remaining request time as its
+        timeout, so a stuck decode is killed instead of holding the worker.
+        """
         try:
             # Get file extension
             file_ext = os.path.splitext(audio_file_path)[1].lower()
             
             if file_ext == '.wav':
                 return audio_file_path
-            
-            # Load audio file
-            if file_ext == '.mp3':
-                audio = AudioSegment.from_mp3(audio_file_path)
-            elif file_ext == '.m4a':
-                audio = AudioSegment.from_file(audio_file_path, format="m4a")
-            elif file_ext == '.ogg':
-                audio = AudioSegment.from_ogg(audio_file_path)
-            elif file_ext == '.flac':
-                audio = AudioSegment.from_file(audio_file_path, format="flac")
-            else:
+
+            if file_ext not in self.supported_formats:
                 raise ValueError(f"Unsupported audio format: {file_ext}")
             
             # Create temporary WAV file
             temp_wav = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
-            audio.export(temp_wav.name, format="wav")
             temp_wav.close()
+
+            try:
+                with trace_stage("decode"):
+                    result = subprocess.run(
+                        [AudioSegment.converter, "-nostdin", "-loglevel", "error", "-y",
+                         "-i", audio_file_path, "-ac", "1", "-ar", str(self.pcm_sample_rate), temp_wav.name],
+                        capture_output=True,
+                        check=False,
+                        timeout=deadline.timeout(self.timeout) if deadline is not None else self.timeout
+                    )
+                if result.returncode != 0:
+                    raise ValueError(f"Audio conversion failed: {result.stderr.decode(errors='replace').strip()}")
+            except Exception:
+                os.unlink(temp_wav.name)
+                raise
             
             return temp_wav.name
             
         except Exception as e:
-            logger.error(f"Error converting audio to WAV: {str(e)}")
+            logger.error("Error converting audio to WAV: %s", e)
             raise
 
-    def transcribe_audio(self, audio_file_path: str, language: str = "en") -> Dict:
+    def auto_candidates(self, hint: Optional[str] = None) -> List[str]:
+        """Candidate languages for auto mode, the client's UI language first"""
+        candidates = []
+        for language in ([hint] if hint else []) + self.auto_languages:
+            if language in self.language_codes and language not in candidates:
+                candidates.append(language)
+        return candidates[:self.auto_max_candidates]
+
+    def transcribe_audio(self, audio_file_path: str, language: str = "en",
+                         candidates: Optional[List[str]] = None, deadline: Optional[Deadline] = None) -> Dict:
         """Transcribe audio file to text"""
         temp_wav_path = None
         
         try:
             # Convert to WAV if necessary
-            temp_wav_path = self.convert_audio_to_wav(audio_file_path)
-            
-            # Get language code for speech recognition
-            lang_code = self.language_codes.get(language, "en-US")
+            temp_wav_path = self.convert_audio_to_wav(audio_file_path, deadline)
             
             # Load audio file
             with sr.AudioFile(temp_wav_path) as source:
@@ -79,37 +187,14 @@ class SpeechService:
                 # Record the audio
                 audio_data = self.recognizer.record(source)
             
-            # Try Google Speech Recognition first
-            try:
-                text = self.recognizer.recognize_google(
-                    audio_data, 
-                    language=lang_code,
-                    show_all=False
-                )
-                
-                return {
-                    "success": True,
-                    "text": text,
-                    "confidence": 0.9,  # Google doesn't provide confidence scores
-                    "language": language,
-                    "method": "google"
-                }
-                
-            except sr.UnknownValueError:
-                return {
-                    "success": False,
-                    "error": "Could not understand the audio",
-                    "text": "",
-                    "confidence": 0.0
-                }
-                
-            except sr.RequestError as e:
-                # Fallback to offline recognition if available
-                logger.warning(f"Google Speech Recognition error: {e}")
-                return self._fallback_recognition(audio_data, language)
+            return self._recognize(audio_data, language, candidates, deadline)
+
+        except subprocess.TimeoutExpired:
+            logger.warning("Audio conversion ran out of time")
+            return _timed_out_result()
                 
         except Exception as e:
-            logger.error(f"Error in speech transcription: {str(e)}")
+            logger.error("Error in speech transcription: %s", e)
             return {
                 "success": False,
                 "error": f"Transcription failed: {str(e)}",
@@ -125,6 +210,220 @@ class SpeechService:
                 except:
                     pass
 
+    def opus_decoder_command(self) -> List[str]:
+        """ffmpeg command decoding Opus (WebM or Ogg) on stdin to PCM on stdout"""
+        return [AudioSegment.converter, "-nostdin", "-loglevel", "error", "-i", "pipe:0",
+                "-f", "s16le", "-ac", "1", "-ar", str(self.pcm_sample_rate), "pipe:1"]
+
+    def decode_opus(self, audio_bytes: bytes, deadline: Optional[Deadline] = None) -> bytes:
+        """Decode an Opus clip (WebM or Ogg) to 16 kHz mono 16-bit PCM.
+
+        ffmpeg reads from stdin and writes raw PCM to stdout, so no temporary
+        files are written and no WAV container is built.
+        """
+        with trace_stage("decode"):
+            result = subprocess.run(
+                self.opus_decoder_command(),
+                input=audio_bytes,
+                capture_output=True,
+                check=False,
+                # ffmpeg is killed when the request runs out of time
+                timeout=deadline.timeout() if deadline is not None else None
+            )
+        if result.returncode != 0:
+            raise ValueError(f"Opus decode failed: {result.stderr.decode(errors='replace').strip()}")
+        return result.stdout
+
+    def transcribe_opus(self, audio_bytes: bytes, language: str = "en",
+                        candidates: Optional[List[str]] = None, deadline: Optional[Deadline] = None) -> Dict:
+        """Transcribe an Opus clip held in memory"""
+        try:
+            pcm = self.decode_opus(audio_bytes, deadline)
+        except subprocess.TimeoutExpired:
+            logger.warning("Opus decode ran out of time")
+            return _timed_out_result()
+        except Exception as e:
+            logger.error("Error decoding Opus audio: %s", e)
+            return {
+                "success": False,
+                "error": f"Transcription failed: {str(e)}",
+                "text": "",
+                "confidence": 0.0
+            }
+        return self.transcribe_pcm(pcm, self.pcm_sample_rate, language, candidates, deadline)
+
+    def transcribe_pcm(self, pcm: bytes, sample_rate: int = 16000, language: str = "en",
+                       candidates: Optional[List[str]] = None, deadline: Optional[Deadline] = None) -> Dict:
+        """Transcribe raw 16-bit mono PCM audio without going through a file"""
+        try:
+            return self._recognize(sr.AudioData(pcm, sample_rate, 2), language, candidates, deadline)
+        except Exception as e:
+            logger.error("Error in PCM transcription: %s", e)
+            return {
+                "success": False,
+                "error": f"Transcription failed: {str(e)}",
+                "text": "",
+                "confidence": 0.0
+            }
+
+    def _recognizer_for(self, deadline: Optional[Deadline]):
+        """The recognizer with its timeout cut to what is left of the deadline"""
+        if deadline is None:
+            return self.recognizer
+        deadline.check("recognizer")
+        # A copy, so concurrent requests do not change each other's timeout
+        recognizer = copy.copy(self.recognizer)
+        recognizer.operation_timeout = deadline.timeout(self.timeout)
+        return recognizer
+
+    def _recognize(self, audio_data, language: str, candidates: Optional[List[str]] = None,
+                   deadline: Optional[Deadline] = None) -> Dict:
+        """Run speech recognition on loaded audio data"""
+        if candidates and len(candidates) > 1:
+            return self._recognize_auto(audio_data, candidates, deadline)
+        if candidates:
+            # Auto mode narrowed down to one language: that is the one to use
+            language = candidates[0]
+
+        # Get language code for speech recognition
+        lang_code = self.language_codes.get(language, "en-US")
+        
+        # Try Google Speech Recognition first
+        try:
+            recognizer = self._recognizer_for(deadline)
+            with trace_stage("recognizer"):
+                text = recognizer.recognize_google(
+                    audio_data, 
+                    language=lang_code,
+                    show_all=False
+                )
+            
+            return {
+                "success": True,
+                "text": text,
+                "confidence": 0.9,  # Google doesn't provide confidence scores
+                "language": language,
+                "method": "google"
+            }
+            
+        except sr.UnknownValueError:
+            return {
+                "success": False,
+                "error": "Could not understand the audio",
+                "text": "",
+                "confidence": 0.0
+            }
+            
+        except (DeadlineExceeded, TimeoutError) as e:
+            logger.warning("Google Speech Recognition ran out of time: %s", e)
+            return _timed_out_result()
+
+        except sr.RequestError as e:
+            if deadline is not None and deadline.expired():
+                # urllib reports a timed-out connection as a request error
+                logger.warning("Google Speech Recognition ran out of time: %s", e)
+                return _timed_out_result()
+            # Fallback to offline recognition if available
+            logger.warning("Google Speech Recognition error: %s", e)
+            return self._fallback_recognition(audio_data, language)
+
+    def _recognize_candidate(self, recognizer, audio_data, language: str) -> Optional[Dict]:
+        """Recognize in one candidate language and score the transcript"""
+        try:
+            text, confidence = recognizer.recognize_google(
+                audio_data,
+                language=self.language_codes[language],
+                with_confidence=True
+            )
+        except sr.UnknownValueError:
+            return None
+
+        # A transcript in the wrong script (e.g. romanized Hindi from en-US)
+        # is a sign the audio was in another language
+        return {
+            "text": text,
+            "confidence": confidence,
+            "language": language,
+            "score": 0.5 * confidence + 0.5 * script_match(text, language)
+        }
+
+    def _recognize_auto(self, audio_data, candidates: List[str], deadline: Optional[Deadline] = None) -> Dict:
+        """Recognize several candidate languages concurrently and keep the best.
+
+        Stops waiting as soon as one result scores above auto_clear_score, or
+        when the deadline runs out (keeping the best result so far). Queued
+        candidates are cancelled; ones already in flight finish in the
+        background, bounded by the recognizer timeout, and are ignored.
+        """
+        try:
+            recognizer = self._recognizer_for(deadline)
+        except DeadlineExceeded:
+            return _timed_out_result()
+
+        futures = {
+            self.auto_executor.submit(self._recognize_candidate, recognizer, audio_data, language): language
+            for language in candidates
+        }
+        best = None
+        best_rank = None
+        scores = {}
+        request_errors = 0
+        timed_out = False
+
+        with trace_stage("recognizer"):
+            try:
+                for future in as_completed(futures, timeout=deadline.remaining() if deadline is not None else None):
+                    try:
+                        result = future.result()
+                    except (sr.RequestError, TimeoutError) as e:
+                        logger.warning("Google Speech Recognition error for %s: %s", futures[future], e)
+                        request_errors += 1
+                        continue
+
+                    if result is None:
+                        continue
+                    scores[result["language"]] = round(result["score"], 3)
+                    # Ties go to the earlier candidate (the client's language), not
+                    # to whichever request happened to finish first
+                    rank = (result["score"], -candidates.index(result["language"]))
+                    if best is None or rank > best_rank:
+                        best, best_rank = result, rank
+                    if best["score"] >= self.auto_clear_score:
+                        break
+            except FuturesTimeoutError:
+                # Not the builtin TimeoutError before Python 3.11
+                logger.warning("Auto-detect ran out of time with %s of %s candidates done", len(scores), len(candidates))
+                timed_out = True
+            finally:
+                for future in futures:
+                    future.cancel()
+
+        if best is None:
+            if timed_out or (deadline is not None and deadline.expired()):
+                return _timed_out_result()
+            if request_errors == len(candidates):
+                return self._fallback_recognition(audio_data, candidates[0])
+            return {
+                "success": False,
+                "error": "Could not understand the audio",
+                "text": "",
+                "confidence": 0.0
+            }
+
+        logger.info("Auto-detected language %s (scores %s)", best["language"], scores)
+        return {
+            "success": True,
+            "text": best["text"],
+            "confidence": best["confidence"],
+            "language": best["language"],
+            "method": "google",
+            "auto_detect": {
+                "candidates": candidates,
+                "scores": scores,
+                "complete": not timed_out
+            }
+        }
+
     def _fallback_recognition(self, audio_data, language: str) -> Dict:
         """Fallback recognition methods when Google fails"""
         try:
@@ -185,26 +484,20 @@ class SpeechService:
                     "error": f"Unsupported format. Supported: {', '.join(self.supported_formats)}"
                 }
             
-            # Try to load the audio file to verify it's valid
-            try:
-                if file_ext == '.wav':
-                    with sr.AudioFile(file_path) as source:
-                        pass  # Just check if it can be opened
-                else:
-                    # For other formats, try to load with pydub
-                    AudioSegment.from_file(file_path)
-                
-                return {
-                    "valid": True,
-                    "file_size": file_size,
-                    "format": file_ext
-                }
-                
-            except Exception as e:
+            # Check the container headers instead of decoding the whole file
+            probe_result = probe_audio_file(file_path)
+            if not probe_result.get('valid', False):
                 return {
                     "valid": False,
-                    "error": f"Invalid audio file: {str(e)}"
+                    "error": probe_result.get('error', 'Invalid audio file')
                 }
+            
+            return {
+                "valid": True,
+                "file_size": file_size,
+                "format": probe_result['format'],
+                "duration": probe_result['duration']
+            }
                 
         except Exception as e:
             return {
@@ -0,0 +1,282 @@
+import os
+import time
+import logging
+import threading
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+import numpy as np
+from dotenv import load_dotenv
+from src.services.speech_service import speech_service
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Audio frames are 16-bit little-endian mono PCM
+SAMPLE_WIDTH = 2
+
+# Sample rates a client may stream at (telephony, wideband, browser capture)
+SUPPORTED_SAMPLE_RATES = (8000, 16000, 48000)
+# Audio encodings a client may stream: raw PCM, or Opus in WebM/Ogg as
+# produced by MediaRecorder (about 16x less upstream data at 16 kbit/s)
+STREAM_ENCODINGS = ("pcm", "opus")
+
+
+class OpusStreamDecoder:
+    """Decodes a growing Opus (WebM or Ogg) byte stream to PCM as it arrives.
+
+    MediaRecorder chunks after the first are not decodable on their own, so
+    one ffmpeg process per session gets the whole stream on stdin; a reader
+    thread collects the PCM it writes to stdout.
+    """
+
+    def __init__(self, command: List[str]):
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                         stderr=subprocess.DEVNULL)
+        self._pcm = bytearray()
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read, name="opus-stream-decoder", daemon=True)
+        self._reader.start()
+
+    def _read(self):
+        while True:
+            chunk = self._process.stdout.read1(4096)
+            if not chunk:
+                return
+            with self._lock:
+                self._pcm.extend(chunk)
+
+    def write(self, data: bytes):
+        self._process.stdin.write(data)
+        self._process.stdin.flush()
+
+    def read(self) -> bytes:
+        """PCM decoded so far and not yet returned"""
+        with self._lock:
+            pcm = bytes(self._pcm)
+            self._pcm.clear()
+        return pcm
+
+    def close(self, timeout: float = 5.0) -> bytes:
+        """Signal the end of the stream and return the remaining PCM"""
+        try:
+            self._process.stdin.close()
+            self._process.wait(timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            self._process.kill()
+        self._reader.join(timeout)
+        return self.read()
+
+    def kill(self):
+        if self._process.poll() is None:
+            self._process.kill()
+
+
+class VoiceActivityDetector:
+    """Energy-based voice activity detection with an adaptive noise floor"""
+
+    def __init__(self, min_energy: float = 300.0, speech_ratio: float = 3.0):
+        self.min_energy = min_energy
+        self.speech_ratio = speech_ratio
+        self.noise_floor = None
+
+    def is_speech(self, frame: bytes) -> bool:
+        samples = np.frombuffer(frame, dtype='<i2').astype(np.float32)
+        energy = float(np.sqrt(np.mean(samples * samples))) if samples.size else 0.0
+
+        if self.noise_floor is None:
+            self.noise_floor = energy
+        speech = energy > max(self.min_energy, self.noise_floor * self.speech_ratio)
+        if not speech:
+            # Only track the floor on non-speech frames, so speech does not raise it
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * energy
+        return speech
+
+
+class StreamingSession:
+    """One live transcription session fed with small PCM frames.
+
+    Frames are cut into fixed VAD frames; a finished utterance (speech
+    followed by enough silence) is transcribed on the thread pool while the
+    user keeps speaking. Results are collected in utterance order.
+
+    A session is limited to `max_session_s` of audio or wall-clock time, and
+    to `max_pending` utterances being transcribed at once; utterances beyond
+    that are dropped, so one client cannot monopolize the shared pool.
+
+    With encoding="opus" the client sends an Opus stream instead, which is
+    decoded to PCM at speech_service's sample rate as it arrives.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, language: str = "en", sample_rate: int = 16000,
+                 frame_ms: int = 20, start_ms: int = 60, hangover_ms: int = 700,
+                 pre_roll_ms: int = 300, max_utterance_ms: int = 15000,
+                 max_session_s: float = 300.0, max_pending: int = 2, encoding: str = "pcm"):
+        if encoding not in STREAM_ENCODINGS:
+            raise ValueError(f"Unsupported encoding: {encoding}")
+        if encoding == "opus":
+            sample_rate = speech_service.pcm_sample_rate
+        if sample_rate not in SUPPORTED_SAMPLE_RATES:
+            raise ValueError(f"Unsupported sample rate: {sample_rate}")
+
+        self.executor = executor
+        self.language = language
+        self.sample_rate = sample_rate
+        self.frame_bytes = sample_rate * frame_ms // 1000 * SAMPLE_WIDTH
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.max_utterance_frames = max(1, max_utterance_ms // frame_ms)
+        self.vad = VoiceActivityDetector()
+        self.max_session_s = max_session_s
+        self.max_pending = max_pending
+        self._started = time.monotonic()
+        self._received_bytes = 0
+        self.encoding = encoding
+        self._decoder = OpusStreamDecoder(speech_service.opus_decoder_command()) if encoding == "opus" else None
+
+        self._remainder = b""
+        self._pre_roll = deque(maxlen=max(1, pre_roll_ms // frame_ms))
+        self._utterance: List[bytes] = []
+        self._in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+
+        self._pending = deque()
+        self._completed = 0
+        self.transcripts: List[str] = []
+
+    def feed_audio(self, data: bytes) -> List[Dict]:
+        """Feed a frame in the session's encoding and return VAD events"""
+        if self._decoder is None:
+            return self.feed(data)
+        self._decoder.write(data)
+        return self.feed(self._decoder.read())
+
+    def feed(self, pcm: bytes) -> List[Dict]:
+        """Feed raw PCM audio and return VAD events"""
+        events = []
+        self._received_bytes += len(pcm)
+        data = self._remainder + pcm
+        usable = len(data) - len(data) % self.frame_bytes
+        self._remainder = data[usable:]
+
+        for offset in range(0, usable, self.frame_bytes):
+            event = self._process_frame(data[offset:offset + self.frame_bytes])
+            if event:
+                events.append(event)
+        return events
+
+    def _process_frame(self, frame: bytes) -> Optional[Dict]:
+        speech = self.vad.is_speech(frame)
+
+        if not self._in_speech:
+            self._pre_roll.append(frame)
+            self._speech_run = self._speech_run + 1 if speech else 0
+            if self._speech_run >= self.start_frames:
+                self._in_speech = True
+                self._silence_run = 0
+                self._utterance = list(self._pre_roll)
+                self._pre_roll.clear()
+                return {"type": "speech_start"}
+            return None
+
+        self._utterance.append(frame)
+        self._silence_run = 0 if speech else self._silence_run + 1
+        if self._silence_run >= self.hangover_frames or len(self._utterance) >= self.max_utterance_frames:
+            return self._end_utterance()
+        return None
+
+    def limit_reached(self) -> bool:
+        """Whether the session has used up its audio or wall-clock allowance"""
+        audio_s = self._received_bytes / (self.sample_rate * SAMPLE_WIDTH)
+        return max(audio_s, time.monotonic() - self._started) >= self.max_session_s
+
+    def _end_utterance(self) -> Dict:
+        pcm = b"".join(self._utterance)
+        self._utterance = []
+        self._in_speech = False
+        self._speech_run = 0
+        if sum(1 for future in self._pending if not future.done()) >= self.max_pending:
+            logger.warning("Dropping utterance: %d transcriptions already in flight", self.max_pending)
+            return {"type": "error", "error": "Too many utterances in flight, utterance dropped"}
+        self._pending.append(self.executor.submit(
+            speech_service.transcribe_pcm, pcm, self.sample_rate, self.language
+        ))
+        return {"type": "speech_end", "duration": round(len(pcm) / (self.sample_rate * SAMPLE_WIDTH), 2)}
+
+    def finish(self) -> List[Dict]:
+        """Close the current utterance when the client stops streaming"""
+        events = []
+        if self._decoder is not None:
+            events = self.feed(self._decoder.close())
+            self._decoder = None
+        if self._in_speech and self._utterance:
+            events.append(self._end_utterance())
+        return events
+
+    def _result_event(self, future) -> Dict:
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.error("Error in streaming transcription: %s", e)
+            result = {"success": False, "error": str(e)}
+
+        self._completed += 1
+        text = result.get('text', '').strip() if result.get('success', False) else ''
+        if text:
+            self.transcripts.append(text)
+        return {
+            "type": "partial",
+            "utterance": self._completed,
+            "text": text,
+            "transcript": self.transcript,
+            "success": bool(text)
+        }
+
+    def poll_results(self) -> List[Dict]:
+        """Return transcription results that are ready, in utterance order"""
+        events = []
+        while self._pending and self._pending[0].done():
+            events.append(self._result_event(self._pending.popleft()))
+        return events
+
+    def drain(self, timeout: Optional[float] = None) -> List[Dict]:
+        """Wait for the outstanding transcriptions and return their results"""
+        if self._decoder is not None:
+            # Aborted without finish(): nothing more will be decoded
+            self._decoder.kill()
+            self._decoder = None
+        wait(list(self._pending), timeout=timeout)
+        events = self.poll_results()
+        # Anything still running after the timeout is dropped
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        return events
+
+    @property
+    def transcript(self) -> str:
+        return " ".join(self.transcripts)
+
+
+class StreamingSpeechService:
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('STREAMING_TRANSCRIBE_WORKERS', '4')),
+            thread_name_prefix="streaming-transcribe"
+        )
+        self.hangover_ms = int(os.getenv('STREAMING_VAD_HANGOVER_MS', '700'))
+        self.drain_timeout = float(os.getenv('STREAMING_DRAIN_TIMEOUT', '15'))
+        self.max_session_s = float(os.getenv('STREAMING_MAX_SESSION_SECONDS', '300'))
+        self.max_pending = int(os.getenv('STREAMING_MAX_PENDING', '2'))
+
+    def create_session(self, language: str = "en", sample_rate: int = 16000,
+                       encoding: str = "pcm") -> StreamingSession:
+        return StreamingSession(self.executor, language, sample_rate, hangover_ms=self.hangover_ms,
+                                max_session_s=self.max_session_s, max_pending=self.max_pending,
+                                encoding=encoding)
+
+# Create a global instance
+streaming_speech_service = StreamingSpeechService()
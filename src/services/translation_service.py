@@ -0,0 +1,257 @@
+import os
+import re
+import copy
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from src.traffic_capture import trace_stage
+from src.deadline import Deadline
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# NLLB-style language codes for the languages supported by the app
+NLLB_LANGUAGE_CODES = {
+    "en": "eng_Latn",
+    "hi": "hin_Deva",
+    "ta": "tam_Taml",
+    "bn": "ben_Beng",
+    "te": "tel_Telu",
+    "mr": "mar_Deva",
+    "gu": "guj_Gujr",
+    "kn": "kan_Knda"
+}
+
+# Markdown prefixes (bullets, numbering, bold markers) are kept as-is and only
+# the text after them is translated, so the response layout survives translation
+_SEGMENT_PREFIX = re.compile(r"^(\s*(?:[*\-•]\s+|\d+[.)]\s+|[०-९]+[.)]\s+)?(?:\*\*)?)")
+_SEGMENT_SUFFIX = re.compile(r"((?:\*\*)?\s*)$")
+
+
+class LRUCache:
+    """Small thread-safe LRU cache used for generations and translated segments"""
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+class TranslationBackend:
+    """Base class for translation backends"""
+
+    name = "base"
+
+    def translate(self, text: str, source_language: str, target_language: str,
+                  deadline: Optional[Deadline] = None) -> str:
+        raise NotImplementedError
+
+
+class LocalTranslationBackend(TranslationBackend):
+    """Offline stand-in backend for development and tests.
+
+    Looks segments up in an optional phrase table and otherwise returns the
+    text unchanged, so the pipeline can run without network access.
+    """
+
+    name = "local"
+
+    def __init__(self, phrase_table: Optional[Dict[Tuple[str, str, str], str]] = None):
+        self.phrase_table = phrase_table or {}
+        self.calls = 0
+
+    def translate(self, text: str, source_language: str, target_language: str,
+                  deadline: Optional[Deadline] = None) -> str:
+        self.calls += 1
+        return self.phrase_table.get((source_language, target_language, text), text)
+
+
+class HuggingFaceTranslationBackend(TranslationBackend):
+    """Translation through the Hugging Face Inference API"""
+
+    name = "huggingface"
+
+    def __init__(self, model_id: Optional[str] = None, token: Optional[str] = None):
+        from huggingface_hub import InferenceClient
+
+        # Upper bound for any single call; a request deadline can only shorten it
+        self.timeout = float(os.getenv('TRANSLATION_TIMEOUT', '30'))
+        self.client = InferenceClient(token=token or os.getenv('HUGGING_FACE_TOKEN'), timeout=self.timeout)
+        self.model_id = model_id or os.getenv('TRANSLATION_MODEL_ID', "facebook/nllb-200-distilled-600M")
+
+    def translate(self, text: str, source_language: str, target_language: str,
+                  deadline: Optional[Deadline] = None) -> str:
+        client = self.client
+        if deadline is not None:
+            # A copy, so concurrent requests do not change each other's timeout
+            client = copy.copy(self.client)
+            client.timeout = deadline.timeout(self.timeout)
+
+        result = client.translation(
+            text,
+            model=self.model_id,
+            src_lang=NLLB_LANGUAGE_CODES.get(source_language, source_language),
+            tgt_lang=NLLB_LANGUAGE_CODES.get(target_language, target_language)
+        )
+        return result.translation_text
+
+
+class TranslationService:
+    def __init__(self, backend: Optional[TranslationBackend] = None):
+        self.backend = backend or self._create_backend(os.getenv('TRANSLATION_BACKEND', 'local'))
+        self.segment_cache = LRUCache(int(os.getenv('TRANSLATION_CACHE_SIZE', '4096')))
+        # Uncached segments of one text are translated concurrently, so a long
+        # answer costs about one backend round trip instead of one per line
+        self.workers = int(os.getenv('TRANSLATION_WORKERS', '4'))
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix="translation"
+        ) if self.workers > 1 else None
+
+    def _create_backend(self, name: str) -> TranslationBackend:
+        """Create the backend configured by TRANSLATION_BACKEND"""
+        if name == "huggingface":
+            return HuggingFaceTranslationBackend()
+        if name != "local":
+            logger.warning("Unknown translation backend '%s', using local backend", name)
+        return LocalTranslationBackend()
+
+    def set_backend(self, backend: TranslationBackend):
+        """Swap the translation backend and drop segments cached by the old one"""
+        self.backend = backend
+        self.segment_cache.clear()
+
+    def split_segments(self, text: str) -> List[str]:
+        """Split text into line segments, the unit of translation and caching"""
+        return text.split("\n")
+
+    def _split_markup(self, segment: str) -> Tuple[str, str, str]:
+        """Split a segment into markdown prefix, translatable body and suffix"""
+        prefix = _SEGMENT_PREFIX.match(segment).group(1)
+        body = segment[len(prefix):]
+        suffix = _SEGMENT_SUFFIX.search(body).group(1)
+        body = body[:len(body) - len(suffix)] if suffix else body
+        return prefix, body, suffix
+
+    def _translate_body(self, body: str, source_language: str, target_language: str,
+                        deadline: Optional[Deadline] = None) -> str:
+        """Translate a segment body through the backend and cache it"""
+        if deadline is not None:
+            deadline.check("translation")
+        translated = self.backend.translate(body, source_language, target_language, deadline)
+        self.segment_cache.set((self.backend.name, source_language, target_language, body), translated)
+        return translated
+
+    def translate_segment(self, segment: str, source_language: str, target_language: str,
+                          deadline: Optional[Deadline] = None) -> str:
+        """Translate a single segment, keeping its markdown prefix and suffix"""
+        if not segment.strip():
+            return segment
+
+        prefix, body, suffix = self._split_markup(segment)
+        if not body.strip():
+            return segment
+
+        translated = self.segment_cache.get((self.backend.name, source_language, target_language, body))
+        if translated is None:
+            with trace_stage("translation"):
+                translated = self._translate_body(body, source_language, target_language, deadline)
+
+        return f"{prefix}{translated}{suffix}"
+
+    def translate(self, text: str, source_language: str, target_language: str,
+                  deadline: Optional[Deadline] = None) -> str:
+        """Translate text segment by segment, reusing cached segments.
+
+        With a deadline, each backend call gets only the time that is left
+        and DeadlineExceeded is raised once it runs out.
+        """
+        if source_language == target_language or not text:
+            return text
+
+        segments = self.split_segments(text)
+        if self.executor is None:
+            return "\n".join(
+                self.translate_segment(segment, source_language, target_language, deadline)
+                for segment in segments
+            )
+
+        # Finished lines are kept as (line, None, ""); lines still to be
+        # translated as (prefix, body, suffix), with each distinct body sent once
+        parts = []
+        missing = {}
+        for segment in segments:
+            prefix, body, suffix = self._split_markup(segment) if segment.strip() else (segment, "", "")
+            translated = None
+            if body.strip():
+                translated = self.segment_cache.get((self.backend.name, source_language, target_language, body))
+                if translated is None:
+                    missing[body] = None
+                    parts.append((prefix, body, suffix))
+                    continue
+            parts.append((segment if translated is None else f"{prefix}{translated}{suffix}", None, ""))
+
+        if missing:
+            with trace_stage("translation"):
+                futures = {
+                    body: self.executor.submit(self._translate_body, body, source_language, target_language, deadline)
+                    for body in missing
+                }
+                try:
+                    for body, future in futures.items():
+                        missing[body] = future.result()
+                except Exception:
+                    for future in futures.values():
+                        future.cancel()
+                    raise
+
+        return "\n".join(
+            prefix if body is None else f"{prefix}{missing[body]}{suffix}"
+            for prefix, body, suffix in parts
+        )
+
+    def get_stats(self) -> Dict:
+        return {
+            "backend": self.backend.name,
+            "segment_cache": self.segment_cache.stats()
+        }
+
+# Create a global instance
+translation_service = TranslationService()
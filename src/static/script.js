@@ -21,6 +21,7 @@ const translations = {
             label: "Describe your symptoms",
             placeholder: "e.g., I have a headache and fever for 2 days...",
             language: "Select Language",
+            autoDetect: "Detect the spoken language for voice input",
             submit: "Get Diagnosis",
             loading: "Analyzing your symptoms...",
             result: {
@@ -113,6 +114,7 @@ const translations = {
             label: "अपने लक्षणों का वर्णन करें",
             placeholder: "जैसे, मुझे 2 दिनों से सिरदर्द और बुखार है...",
             language: "भाषा चुनें",
+            autoDetect: "आवाज़ से बोली गई भाषा पहचानें",
             submit: "निदान प्राप्त करें",
             loading: "आपके लक्षणों का विश्लेषण हो रहा है...",
             result: {
@@ -134,6 +136,11 @@ let searchHistory = JSON.parse(localStorage.getItem('nirogai_history')) || [];
 let isRecording = false;
 let mediaRecorder = null;
 let audioChunks = [];
+let speechSocket = null;
+let audioContext = null;
+let audioProcessor = null;
+let streamingRecorder = null;
+let streamingBaseText = '';
 
 // API Configuration
 const API_BASE_URL = window.location.origin + '/api';
@@ -258,8 +265,28 @@ async function toggleSpeechRecognition() {
     if (!isRecording) {
         try {
             // Start recording
-            const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
-            mediaRecorder = new MediaRecorder(stream);
+            // Mono 16 kHz is all speech recognition needs
+            const stream = await navigator.mediaDevices.getUserMedia({
+                audio: { channelCount: 1, sampleRate: 16000, echoCancellation: true, noiseSuppression: true }
+            });
+
+            // Prefer live streaming transcription; fall back to uploading a recording
+            try {
+                await startStreamingRecognition(stream);
+                isRecording = true;
+                speechBtn.classList.add('recording');
+                speechBtn.innerHTML = '<i class="fas fa-stop"></i>';
+                speechBtn.title = 'Click to stop recording';
+                return;
+            } catch (streamError) {
+                console.warn('Live transcription unavailable, recording instead:', streamError);
+            }
+
+            // Record compact Opus when the browser supports it (roughly 10x smaller than WAV)
+            const recordingFormat = getRecordingFormat();
+            mediaRecorder = recordingFormat
+                ? new MediaRecorder(stream, { mimeType: recordingFormat.mimeType, audioBitsPerSecond: 16000 })
+                : new MediaRecorder(stream);
             audioChunks = [];
             
             mediaRecorder.ondataavailable = (event) => {
@@ -267,8 +294,9 @@ async function toggleSpeechRecognition() {
             };
             
             mediaRecorder.onstop = async () => {
-                const audioBlob = new Blob(audioChunks, { type: 'audio/wav' });
-                await processSpeechToText(audioBlob);
+                const mimeType = mediaRecorder.mimeType || 'audio/wav';
+                const audioBlob = new Blob(audioChunks, { type: mimeType });
+                await processSpeechToText(audioBlob, getRecordingFilename(mimeType));
                 
                 // Stop all tracks
                 stream.getTracks().forEach(track => track.stop());
@@ -286,7 +314,9 @@ async function toggleSpeechRecognition() {
         }
     } else {
         // Stop recording
-        if (mediaRecorder && mediaRecorder.state === 'recording') {
+        if (speechSocket) {
+            stopStreamingRecognition();
+        } else if (mediaRecorder && mediaRecorder.state === 'recording') {
             mediaRecorder.stop();
         }
         isRecording = false;
@@ -296,7 +326,156 @@ async function toggleSpeechRecognition() {
     }
 }
 
-async function processSpeechToText(audioBlob) {
+function openSpeechSocket() {
+    return new Promise((resolve, reject) => {
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        const socket = new WebSocket(`${protocol}//${window.location.host}/api/speech/stream`);
+        socket.binaryType = 'arraybuffer';
+
+        const timer = setTimeout(() => {
+            socket.close();
+            reject(new Error('WebSocket connection timed out'));
+        }, 3000);
+
+        socket.onopen = () => {
+            clearTimeout(timer);
+            resolve(socket);
+        };
+        socket.onerror = () => {
+            clearTimeout(timer);
+            reject(new Error('WebSocket connection failed'));
+        };
+    });
+}
+
+function downsampleToPCM16(input, inputRate, outputRate) {
+    // Average the input samples that fall into each output sample
+    const ratio = inputRate / outputRate;
+    const output = new Int16Array(Math.floor(input.length / ratio));
+
+    for (let i = 0; i < output.length; i++) {
+        const start = Math.floor(i * ratio);
+        const end = Math.min(input.length, Math.floor((i + 1) * ratio));
+        let sum = 0;
+        for (let j = start; j < end; j++) {
+            sum += input[j];
+        }
+        const sample = Math.max(-1, Math.min(1, sum / Math.max(1, end - start)));
+        output[i] = sample < 0 ? sample * 0x8000 : sample * 0x7FFF;
+    }
+    return output.buffer;
+}
+
+async function startStreamingRecognition(stream) {
+    const socket = await openSpeechSocket();
+    const language = document.getElementById('language-select').value;
+    const symptomsInput = document.getElementById('symptoms-input');
+
+    // Stream compact Opus (16 kbit/s) when the browser can record it, else raw PCM (256 kbit/s)
+    const recordingFormat = getRecordingFormat();
+
+    speechSocket = socket;
+    streamingBaseText = symptomsInput.value.trim();
+    socket.send(JSON.stringify(recordingFormat
+        ? { type: 'start', language: language, encoding: 'opus' }
+        : { type: 'start', language: language, encoding: 'pcm', sample_rate: 16000 }));
+
+    socket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+
+        if (message.type === 'error') {
+            showNotification(message.error, 'info');
+        }
+
+        if (message.type === 'partial' || message.type === 'final') {
+            const text = (message.type === 'final' ? message.text : message.transcript).trim();
+            symptomsInput.value = [streamingBaseText, text].filter(Boolean).join(' ');
+        }
+
+        if (message.type === 'final') {
+            if (message.text) {
+                showNotification('Speech recognized successfully!', 'success');
+            } else {
+                showNotification('Speech recognition failed. Please try again.', 'error');
+            }
+            socket.close();
+        }
+    };
+
+    socket.onclose = () => {
+        speechSocket = null;
+        stream.getTracks().forEach(track => track.stop());
+    };
+
+    if (recordingFormat) {
+        streamingRecorder = new MediaRecorder(stream, { mimeType: recordingFormat.mimeType, audioBitsPerSecond: 16000 });
+        streamingRecorder.ondataavailable = (event) => {
+            if (event.data.size > 0 && socket.readyState === WebSocket.OPEN) {
+                socket.send(event.data);
+            }
+        };
+        // Sent after the last chunk, so the server decodes everything before finishing
+        streamingRecorder.onstop = () => {
+            if (socket.readyState === WebSocket.OPEN) {
+                socket.send(JSON.stringify({ type: 'stop' }));
+            }
+        };
+        streamingRecorder.start(250);
+        return;
+    }
+
+    audioContext = new (window.AudioContext || window.webkitAudioContext)();
+    const source = audioContext.createMediaStreamSource(stream);
+    audioProcessor = audioContext.createScriptProcessor(4096, 1, 1);
+    audioProcessor.onaudioprocess = (event) => {
+        if (socket.readyState === WebSocket.OPEN) {
+            socket.send(downsampleToPCM16(event.inputBuffer.getChannelData(0), audioContext.sampleRate, 16000));
+        }
+    };
+    source.connect(audioProcessor);
+    audioProcessor.connect(audioContext.destination);
+}
+
+function stopStreamingRecognition() {
+    if (streamingRecorder) {
+        // The recorder flushes its last chunk, then its onstop handler sends the stop message
+        if (streamingRecorder.state === 'recording') {
+            streamingRecorder.stop();
+        }
+        streamingRecorder = null;
+        return;
+    }
+    if (audioProcessor) {
+        audioProcessor.disconnect();
+        audioProcessor = null;
+    }
+    if (audioContext) {
+        audioContext.close();
+        audioContext = null;
+    }
+    // The server flushes the last utterance and answers with a final transcript
+    if (speechSocket && speechSocket.readyState === WebSocket.OPEN) {
+        speechSocket.send(JSON.stringify({ type: 'stop' }));
+    }
+}
+
+function getRecordingFormat() {
+    const formats = [
+        { mimeType: 'audio/webm;codecs=opus', extension: 'webm' },
+        { mimeType: 'audio/ogg;codecs=opus', extension: 'ogg' }
+    ];
+    if (!window.MediaRecorder || !MediaRecorder.isTypeSupported) return null;
+    return formats.find(format => MediaRecorder.isTypeSupported(format.mimeType)) || null;
+}
+
+function getRecordingFilename(mimeType) {
+    if (mimeType.includes('webm')) return 'recording.webm';
+    if (mimeType.includes('ogg')) return 'recording.ogg';
+    if (mimeType.includes('mp4')) return 'recording.m4a';
+    return 'recording.wav';
+}
+
+async function processSpeechToText(audioBlob, filename = 'recording.wav') {
     try {
         const languageSelect = document.getElementById('language-select');
         const language = languageSelect.value;
@@ -308,8 +487,12 @@ async function processSpeechToText(audioBlob) {
         
         // Create form data
         const formData = new FormData();
-        formData.append('audio', audioBlob, 'recording.wav');
+        formData.append('audio', audioBlob, filename);
         formData.append('language', language);
+        // Opt-in: also trying the other likely languages costs extra recognizer calls
+        if (document.getElementById('speech-auto-detect').checked) {
+            formData.append('auto_detect', 'true');
+        }
         
         // Send to backend
         const response = await fetch(`${API_BASE_URL}/speech-to-text`, {
@@ -331,8 +514,15 @@ async function processSpeechToText(audioBlob) {
                 symptomsInput.value = newText;
             }
             
-            // Show success message
-            showNotification('Speech recognized successfully!', 'success');
+            // Answer in the language that was actually spoken
+            if (result.data.language && result.data.language !== language &&
+                languageSelect.querySelector(`option[value="${result.data.language}"]`)) {
+                languageSelect.value = result.data.language;
+                showNotification(`Speech recognized in ${languageSelect.selectedOptions[0].textContent}`, 'success');
+            } else {
+                // Show success message
+                showNotification('Speech recognized successfully!', 'success');
+            }
         } else {
             throw new Error(result.error || 'Speech recognition failed');
         }
@@ -492,7 +682,9 @@ async function handleSymptomsSubmit(e) {
             body: JSON.stringify({
                 symptoms: symptoms,
                 language: language,
-                user_id: generateUserId()
+                user_id: generateUserId(),
+                // Emergency responses come back instantly; ask for the full analysis to follow
+                elaborate: true
             })
         });
         
@@ -504,6 +696,11 @@ async function handleSymptomsSubmit(e) {
             
             // Show result
             displayResult(result.data);
+
+            // Emergency responses may have an LLM elaboration arriving later
+            if (result.data.elaboration && result.data.elaboration.status === 'pending') {
+                pollElaboration(result.request_id);
+            }
         } else {
             throw new Error(result.error || 'Analysis failed');
         }
@@ -516,6 +713,34 @@ async function handleSymptomsSubmit(e) {
     }
 }
 
+async function pollElaboration(requestId, attempt = 0) {
+    if (attempt >= 20) return;
+
+    try {
+        const response = await fetch(`${API_BASE_URL}/analysis/${requestId}`);
+        const result = await response.json();
+
+        // A 404 can come from another server worker than the one running the analysis
+        if (response.status === 404 || (result.success && result.data.status === 'pending')) {
+            setTimeout(() => pollElaboration(requestId, attempt + 1), 1500);
+        } else if (result.success && result.data.status === 'completed') {
+            appendElaboration(result.data.analysis);
+        }
+    } catch (error) {
+        console.error('Error fetching analysis details:', error);
+    }
+}
+
+function appendElaboration(analysisText) {
+    const analysisContent = document.querySelector('#result-content .analysis-content');
+    if (!analysisContent) return;
+
+    let formattedHtml = analysisText.replace(/\n/g, '<br>');
+    formattedHtml = formattedHtml.replace(/\*\*(.*?)\*\*/g, '<strong>$1</strong>');
+
+    analysisContent.insertAdjacentHTML('beforeend', `<hr><div class="analysis-elaboration">${formattedHtml}</div>`);
+}
+
 function generateUserId() {
     // Generate a simple user ID for session tracking
     let userId = localStorage.getItem('nirogai_user_id');
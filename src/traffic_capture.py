@@ -0,0 +1,157 @@
+import os
+import hmac
+import json
+import time
+import random
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+
+logger = logging.getLogger(__name__)
+
+
+def payload_shape(value):
+    """Structure of a payload with every value replaced by its type name"""
+    if isinstance(value, dict):
+        return {key: payload_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [payload_shape(value[0])] if value else []
+    return type(value).__name__
+
+
+@contextmanager
+def trace_stage(name: str):
+    """Time an upstream call (LLM, recognizer, ...) into the current request trace.
+
+    Costs a single lookup when the request is not being captured.
+    """
+    trace = g.get('trace') if has_request_context() else None
+    if trace is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace["stages"].append([name, round((time.perf_counter() - start) * 1000, 1)])
+
+
+def annotate_trace(**fields):
+    """Add fields the route knows about (severity, audio duration, ...) to the trace"""
+    trace = g.get('trace') if has_request_context() else None
+    if trace is not None:
+        trace.update(fields)
+
+
+class TraceWriter:
+    """Appends one compact JSON line per trace.
+
+    Each line is a single O_APPEND write, so several worker processes can
+    share one capture file without interleaving records.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        self._lock = threading.Lock()
+
+    def write(self, trace: dict):
+        line = json.dumps(trace, ensure_ascii=False, separators=(',', ':')) + "\n"
+        with self._lock:
+            os.write(self._fd, line.encode('utf-8'))
+
+    def close(self):
+        os.close(self._fd)
+
+
+def read_traces(path: str) -> list:
+    """Load a capture file, skipping a partially written last line"""
+    traces = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                traces.append(json.loads(line))
+            except ValueError:
+                continue
+    return traces
+
+
+def configure_traffic_capture(app):
+    """Record anonymized request traces when TRAFFIC_CAPTURE_PATH is set.
+
+    A trace holds the endpoint, payload shape, language, a keyed hash and the
+    length of the symptom text, route annotations such as audio duration,
+    the request time and the latency of each upstream stage. Symptom text
+    and audio are never written. TRAFFIC_CAPTURE_SAMPLE_RATE captures a
+    fraction of requests to TRAFFIC_CAPTURE_ENDPOINTS.
+    """
+    path = os.getenv('TRAFFIC_CAPTURE_PATH', '')
+    if not path:
+        return None
+
+    sample_rate = float(os.getenv('TRAFFIC_CAPTURE_SAMPLE_RATE', '1.0'))
+    endpoints = {
+        endpoint.strip()
+        for endpoint in os.getenv('TRAFFIC_CAPTURE_ENDPOINTS', '/api/analyze-symptoms,/api/speech-to-text').split(',')
+        if endpoint.strip()
+    }
+    salt = os.getenv('TRAFFIC_CAPTURE_SALT', '')
+    if not salt:
+        # Repeats are still linked within this process, but not across restarts
+        logger.warning("TRAFFIC_CAPTURE_SALT not set, using a random per-process salt")
+        salt = f"{random.getrandbits(128):032x}"
+    salt = salt.encode('utf-8')
+
+    writer = TraceWriter(path)
+    logger.info("Capturing request traces to %s", path)
+
+    @app.before_request
+    def start_trace():
+        if request.path in endpoints and (sample_rate >= 1.0 or random.random() < sample_rate):
+            g.trace = {"stages": []}
+            g.trace_start = time.perf_counter()
+
+    @app.after_request
+    def write_trace(response):
+        trace = g.pop('trace', None)
+        if trace is None:
+            return response
+
+        try:
+            if request.is_json:
+                payload = request.get_json(silent=True) or {}
+                shape = payload_shape(payload)
+            else:
+                payload = request.form
+                shape = {
+                    "form": {key: "str" for key in request.form},
+                    "files": {key: "file" for key in request.files}
+                }
+
+            symptoms = payload.get('symptoms')
+            if isinstance(symptoms, str) and symptoms.strip():
+                normalized = " ".join(symptoms.lower().split()).encode('utf-8')
+                trace["symptom_hash"] = hmac.new(salt, normalized, hashlib.sha256).hexdigest()[:16]
+                trace["symptom_chars"] = len(symptoms.strip())
+
+            trace.update({
+                "ts": round(time.time(), 3),
+                "method": request.method,
+                "endpoint": request.path,
+                "status": response.status_code,
+                "ms": round((time.perf_counter() - g.pop('trace_start')) * 1000, 1),
+                "language": payload.get('language'),
+                "shape": shape
+            })
+            writer.write(trace)
+        except Exception as e:
+            logger.error("Error writing request trace: %s", e)
+        return response
+
+    return writer
@@ -0,0 +1,126 @@
+import pytest
+
+from src.services.answer_index import AnswerIndex, AnswerRetrievalService
+
+SYMPTOMS = "I have had a high fever and a bad headache for three days with body pain"
+NEAR_DUPLICATE = "I have had a high fever and a bad headache for three days with body pain and chills"
+ANSWER = "Rest, drink fluids and see a doctor if the fever lasts beyond three days."
+
+
+def test_reviewed_answer_is_found_for_near_duplicate():
+    index = AnswerIndex()
+    entry_id = index.add(SYMPTOMS, "en", "fever", ANSWER, reviewed=True)
+
+    exact = index.lookup(SYMPTOMS, "en", "fever")
+    assert exact["entry_id"] == entry_id and exact["score"] == 1.0
+
+    match = index.lookup(NEAR_DUPLICATE, "en", "fever")
+    assert match["entry_id"] == entry_id
+    assert 0.8 <= match["score"] < 1.0
+    assert match["answer"] == ANSWER
+
+
+def test_lookup_is_scoped_to_language_and_category():
+    index = AnswerIndex()
+    index.add(SYMPTOMS, "en", "fever", ANSWER, reviewed=True)
+    assert index.lookup(SYMPTOMS, "hi", "fever") is None
+    assert index.lookup(SYMPTOMS, "en", "cough") is None
+
+
+def test_unreviewed_answer_is_not_served():
+    index = AnswerIndex()
+    index.add(SYMPTOMS, "en", "fever", ANSWER)
+    assert index.lookup(SYMPTOMS, "en", "fever") is None
+    assert index.lookup(NEAR_DUPLICATE, "en", "fever") is None
+
+
+def test_unreviewed_variants_do_not_crowd_out_reviewed_answer():
+    index = AnswerIndex(max_candidates=4, max_pending=2000)
+    entry_id = index.add(SYMPTOMS, "en", "fever", ANSWER, reviewed=True)
+    for i in range(1000):
+        index.add(f"{SYMPTOMS} variant {i}", "en", "fever", f"unreviewed {i}")
+
+    match = index.lookup(NEAR_DUPLICATE, "en", "fever")
+    assert match is not None and match["entry_id"] == entry_id
+
+
+def test_unreviewed_answer_never_replaces_reviewed_one():
+    index = AnswerIndex()
+    entry_id = index.add(SYMPTOMS, "en", "fever", ANSWER, reviewed=True)
+    assert index.add(SYMPTOMS, "en", "fever", "something else") is None
+    assert index.lookup(SYMPTOMS, "en", "fever")["entry_id"] == entry_id
+    assert index.lookup(SYMPTOMS, "en", "fever")["answer"] == ANSWER
+
+
+def test_mark_reviewed_serves_and_withdraws():
+    index = AnswerIndex()
+    entry_id = index.add(SYMPTOMS, "en", "fever", ANSWER)
+    assert index.pending_count == 1
+
+    entry = index.mark_reviewed(entry_id)
+    assert entry["reviewed"] and "features" not in entry
+    assert index.pending_count == 0
+    assert index.lookup(NEAR_DUPLICATE, "en", "fever")["entry_id"] == entry_id
+
+    index.mark_reviewed(entry_id, reviewed=False)
+    assert index.lookup(SYMPTOMS, "en", "fever") is None
+    assert index.lookup(NEAR_DUPLICATE, "en", "fever") is None
+
+    assert index.mark_reviewed("0" * 16) is None
+
+
+def test_oldest_unreviewed_answers_are_evicted():
+    index = AnswerIndex(max_pending=3)
+    reviewed_id = index.add(SYMPTOMS, "en", "fever", ANSWER, reviewed=True)
+    ids = [index.add(f"cough number {i} with cold", "en", "cough", "answer") for i in range(5)]
+
+    assert index.pending_count == 3
+    assert [entry["entry_id"] for entry in index.entries(reviewed=False)] == ids[2:]
+    assert index.mark_reviewed(ids[0]) is None
+    assert len(index) == 4
+    assert index.mark_reviewed(reviewed_id) is not None
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "answers.jsonl")
+    index = AnswerIndex()
+    reviewed_id = index.add(SYMPTOMS, "en", "fever", ANSWER, reviewed=True)
+    pending_id = index.add("stomach ache after eating street food", "en", "stomach", "answer")
+    index.save(path)
+
+    loaded = AnswerIndex()
+    assert loaded.load(path) == 2
+    assert loaded.lookup(NEAR_DUPLICATE, "en", "fever")["entry_id"] == reviewed_id
+    assert [entry["entry_id"] for entry in loaded.entries(reviewed=False)] == [pending_id]
+
+
+@pytest.fixture
+def index_env(tmp_path, monkeypatch):
+    path = tmp_path / "answers.jsonl"
+    monkeypatch.setenv("ANSWER_INDEX_ENABLED", "true")
+    monkeypatch.setenv("ANSWER_INDEX_PATH", str(path))
+    monkeypatch.setenv("ANSWER_INDEX_REFRESH_SECONDS", "0")
+    return path
+
+
+def test_review_through_one_worker_is_served_by_another(index_env):
+    first = AnswerRetrievalService()
+    second = AnswerRetrievalService()
+
+    entry_id = first.record_answer(SYMPTOMS, "en", "fever", ANSWER)
+    assert second.find_answer(SYMPTOMS, "en", "fever") is None
+    assert second.index.find_entry(SYMPTOMS, "en", "fever") == entry_id
+
+    first.review_answer(entry_id)
+    assert second.find_answer(NEAR_DUPLICATE, "en", "fever")["answer"] == ANSWER
+
+    # A restarted worker replays the answer and the review decision
+    restarted = AnswerRetrievalService()
+    assert restarted.find_answer(SYMPTOMS, "en", "fever")["entry_id"] == entry_id
+
+
+def test_disabled_service_stores_nothing(index_env, monkeypatch):
+    monkeypatch.setenv("ANSWER_INDEX_ENABLED", "false")
+    service = AnswerRetrievalService()
+    assert service.record_answer(SYMPTOMS, "en", "fever", ANSWER) is None
+    assert not index_env.exists()
@@ -0,0 +1,202 @@
+import io
+import os
+import struct
+
+from src.services.audio_probe import detect_format, probe_audio
+
+
+def vint(n):
+    """EBML size of up to 126 as a one-byte variable-length integer"""
+    return bytes([0x80 | n])
+
+
+def ebml(element_id, body):
+    return element_id + vint(len(body)) + body
+
+
+def wav_file(seconds=1.5, sample_rate=16000, channels=1, extra_chunk=b''):
+    byte_rate = sample_rate * channels * 2
+    data = b'\0' * int(byte_rate * seconds)
+    fmt = struct.pack('<HHIIHH', 1, channels, sample_rate, byte_rate, channels * 2, 16)
+    body = b'WAVE' + b'fmt ' + struct.pack('<I', len(fmt)) + fmt + extra_chunk
+    body += b'data' + struct.pack('<I', len(data)) + data
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def flac_file(total_samples=44100 * 3, sample_rate=44100, channels=2):
+    packed = (sample_rate << 44) | ((channels - 1) << 41) | (15 << 36) | total_samples
+    streaminfo = struct.pack('>HH', 4096, 4096) + b'\0' * 6 + packed.to_bytes(8, 'big') + b'\0' * 16
+    return b'fLaC' + bytes([0x80]) + len(streaminfo).to_bytes(3, 'big') + streaminfo + b'\0' * 100
+
+
+def ogg_page(packet, granule=0):
+    return (b'OggS' + bytes([0, 2]) + struct.pack('<qIII', granule, 1, 0, 0)
+            + bytes([1, len(packet)]) + packet)
+
+
+def opus_file(seconds=2.0, pre_skip=312):
+    head = b'OpusHead' + struct.pack('<BBHIhB', 1, 1, pre_skip, 16000, 0, 0)
+    return ogg_page(head) + b'\0' * 500 + ogg_page(b'\0' * 10, granule=int(seconds * 48000) + pre_skip)
+
+
+def webm_file(duration_ms=None, last_cluster_ms=None, codec=b'A_OPUS', doc_type=b'webm'):
+    header = ebml(b'\x1a\x45\xdf\xa3', ebml(b'\x42\x82', doc_type))
+    info = ebml(b'\x2a\xd7\xb1', (1000000).to_bytes(3, 'big'))
+    if duration_ms is not None:
+        info += ebml(b'\x44\x89', struct.pack('>f', duration_ms))
+    tracks = ebml(b'\xae', ebml(b'\x86', codec))
+    segment = ebml(b'\x15\x49\xa9\x66', info) + ebml(b'\x16\x54\xae\x6b', tracks)
+    cluster = ebml(b'\x1f\x43\xb6\x75', ebml(b'\xe7', (0).to_bytes(2, 'big')) + b'\0' * 50)
+    data = header + b'\x18\x53\x80\x67' + b'\x01\xff\xff\xff\xff\xff\xff\xff' + segment + cluster
+    if last_cluster_ms is not None:
+        data += b'\0' * 200 + ebml(b'\x1f\x43\xb6\x75', ebml(b'\xe7', last_cluster_ms.to_bytes(2, 'big')) + b'\0' * 50)
+    return data
+
+
+def box(box_type, body):
+    return struct.pack('>I', 8 + len(body)) + box_type + body
+
+
+def m4a_file(seconds=4.0, timescale=44100, moov_last=True):
+    mvhd = box(b'mvhd', bytes([0, 0, 0, 0]) + struct.pack('>IIII', 0, 0, timescale, int(seconds * timescale)))
+    ftyp = box(b'ftyp', b'M4A ' + b'\0\0\0\0' + b'isomM4A ')
+    mdat = box(b'mdat', b'\0' * 1000)
+    moov = box(b'moov', mvhd)
+    return ftyp + (mdat + moov if moov_last else moov + mdat)
+
+
+MP3_FRAME_HEADER = b'\xff\xfb\x90\xc4'  # MPEG-1 layer III, 128 kbit/s, 44.1 kHz, mono
+
+
+def mp3_file(size=16000, id3=b'', xing_frames=None):
+    frame = MP3_FRAME_HEADER + b'\0' * 32
+    if xing_frames is not None:
+        frame += b'Xing' + struct.pack('>II', 1, xing_frames)
+    data = frame + b'\0' * (size - len(frame))
+    if id3:
+        tag_size = len(id3)
+        synchsafe = bytes([(tag_size >> 21) & 0x7F, (tag_size >> 14) & 0x7F, (tag_size >> 7) & 0x7F, tag_size & 0x7F])
+        data = b'ID3\x04\x00\x00' + synchsafe + id3 + data
+    return data
+
+
+def probe(data):
+    return probe_audio(io.BytesIO(data))
+
+
+def test_detect_format_by_magic_bytes():
+    assert detect_format(wav_file()[:64]) == '.wav'
+    assert detect_format(flac_file()[:64]) == '.flac'
+    assert detect_format(opus_file()[:64]) == '.ogg'
+    assert detect_format(webm_file(duration_ms=1000.0)[:64]) == '.webm'
+    assert detect_format(m4a_file()[:64]) == '.m4a'
+    assert detect_format(mp3_file()[:64]) == '.mp3'
+    assert detect_format(b'ID3\x04') == '.mp3'
+    assert detect_format(b'hello world') is None
+    assert detect_format(b'') is None
+
+
+def test_wav_duration_skips_other_chunks():
+    extra = b'LIST' + struct.pack('<I', 5) + b'abcde' + b'\0'  # odd size is padded
+    result = probe(wav_file(seconds=1.5, extra_chunk=extra))
+    assert result['valid'] and result['format'] == '.wav'
+    assert result['duration'] == 1.5
+    assert result['sample_rate'] == 16000 and result['channels'] == 1
+
+
+def test_wav_without_data_chunk_is_invalid():
+    data = wav_file()
+    result = probe(data[:data.index(b'data')])
+    assert not result['valid']
+    assert result['format'] == '.wav'
+
+
+def test_flac_duration_from_streaminfo():
+    result = probe(flac_file(total_samples=44100 * 3))
+    assert result['valid']
+    assert result['duration'] == 3.0
+    assert result['sample_rate'] == 44100 and result['channels'] == 2
+
+
+def test_truncated_flac_is_invalid():
+    assert not probe(flac_file()[:30])['valid']
+
+
+def test_ogg_opus_duration_from_last_granule():
+    result = probe(opus_file(seconds=2.0))
+    assert result['valid'] and result['codec'] == 'opus'
+    assert result['duration'] == 2.0
+    assert result['channels'] == 1
+
+
+def test_ogg_vorbis_is_recognized():
+    head = b'\x01vorbis' + struct.pack('<IBI', 0, 2, 22050) + b'\0' * 14
+    result = probe(ogg_page(head) + ogg_page(b'\0', granule=22050 * 2))
+    assert result['valid'] and result['codec'] == 'vorbis'
+    assert result['duration'] == 2.0
+
+
+def test_ogg_with_unknown_codec_is_invalid():
+    assert not probe(ogg_page(b'Speex   ' + b'\0' * 40))['valid']
+
+
+def test_webm_duration_from_info():
+    result = probe(webm_file(duration_ms=2500.0))
+    assert result['valid'] and result['codec'] == 'opus'
+    assert result['duration'] == 2.5
+
+
+def test_live_webm_duration_from_last_cluster():
+    result = probe(webm_file(last_cluster_ms=3000))
+    assert result['valid']
+    assert result['duration'] == 3.0
+
+
+def test_webm_with_other_doc_type_or_codec_is_invalid():
+    assert not probe(webm_file(duration_ms=1000.0, doc_type=b'junk'))['valid']
+    assert not probe(webm_file(duration_ms=1000.0, codec=b'V_VP8'))['valid']
+
+
+def test_truncated_webm_is_invalid():
+    assert not probe(webm_file(duration_ms=1000.0)[:6])['valid']
+
+
+def test_m4a_duration_with_moov_after_mdat():
+    for moov_last in (True, False):
+        result = probe(m4a_file(seconds=4.0, moov_last=moov_last))
+        assert result['valid']
+        assert result['duration'] == 4.0
+
+
+def test_m4a_without_moov_is_invalid():
+    data = m4a_file()
+    assert not probe(data[:data.index(b'moov') - 4])['valid']
+
+
+def test_cbr_mp3_duration_from_size():
+    result = probe(mp3_file(size=16000))
+    assert result['valid']
+    assert result['duration'] == 1.0  # 16000 bytes at 128 kbit/s
+    assert result['sample_rate'] == 44100 and result['channels'] == 1
+
+
+def test_vbr_mp3_duration_from_xing_header_after_id3_tag():
+    result = probe(mp3_file(id3=b'\0' * 100, xing_frames=441))
+    assert result['valid']
+    assert round(result['duration'], 3) == round(441 * 1152 / 44100, 3)
+
+
+def test_mp3_sync_without_valid_frame_is_invalid():
+    assert not probe(b'\xff\xe0' + b'\0' * 100)['valid']
+
+
+def test_junk_is_rejected():
+    result = probe(os.urandom(1024).replace(b'\xff', b'\0'))
+    assert not result['valid']
+    assert result['error'] == "Unrecognized audio format"
+
+
+def test_stream_is_rewound():
+    stream = io.BytesIO(opus_file())
+    probe_audio(stream)
+    assert stream.tell() == 0
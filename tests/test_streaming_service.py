@@ -0,0 +1,123 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from src.services.speech_service import speech_service
+from src.services.streaming_service import StreamingSession, VoiceActivityDetector
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = SAMPLE_RATE // 50  # 20 ms
+
+
+def tone(frames, amplitude):
+    t = np.arange(frames * FRAME_SAMPLES) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 440 * t)).astype('<i2').tobytes()
+
+
+def silence(frames):
+    return tone(frames, 20)
+
+
+def speech(frames):
+    return tone(frames, 5000)
+
+
+@pytest.fixture
+def transcribed(monkeypatch):
+    calls = []
+
+    def transcribe_pcm(pcm, sample_rate=16000, language="en", *args, **kwargs):
+        calls.append(pcm)
+        return {"success": True, "text": f"utterance {len(calls)}"}
+
+    monkeypatch.setattr(speech_service, "transcribe_pcm", transcribe_pcm)
+    return calls
+
+
+@pytest.fixture
+def executor():
+    executor = ThreadPoolExecutor(max_workers=2)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+def test_vad_separates_speech_from_noise_floor():
+    vad = VoiceActivityDetector()
+    assert not vad.is_speech(silence(1))
+    assert vad.is_speech(speech(1))
+    assert not vad.is_speech(silence(1))
+    assert not vad.is_speech(b"")
+
+
+def test_vad_noise_floor_is_not_raised_by_speech():
+    vad = VoiceActivityDetector()
+    vad.is_speech(silence(1))
+    floor = vad.noise_floor
+    for _ in range(50):
+        vad.is_speech(speech(1))
+    assert vad.noise_floor == floor
+
+
+def test_utterance_starts_after_start_ms_and_ends_after_hangover(executor, transcribed):
+    session = StreamingSession(executor, sample_rate=SAMPLE_RATE)
+
+    assert session.feed(silence(20)) == []
+    assert session.feed(speech(2)) == []
+    assert session.feed(speech(1)) == [{"type": "speech_start"}]
+    assert session.feed(speech(22)) == []
+    assert session.feed(silence(34)) == []
+
+    # 15 frames of pre-roll, 22 of speech and 35 of hangover silence
+    assert session.feed(silence(1)) == [{"type": "speech_end", "duration": 1.44}]
+
+    events = session.drain(timeout=5)
+    assert [event["text"] for event in events] == ["utterance 1"]
+    assert session.transcript == "utterance 1"
+    assert len(transcribed[0]) == 72 * FRAME_SAMPLES * 2
+
+
+def test_short_click_does_not_start_an_utterance(executor, transcribed):
+    session = StreamingSession(executor, sample_rate=SAMPLE_RATE)
+    events = session.feed(silence(10) + speech(2) + silence(50))
+    assert events == []
+    assert session.finish() == []
+    assert transcribed == []
+
+
+def test_frames_split_across_feeds_are_reassembled(executor, transcribed):
+    session = StreamingSession(executor, sample_rate=SAMPLE_RATE)
+    audio = silence(10) + speech(10) + silence(40)
+    events = []
+    for offset in range(0, len(audio), 333):
+        events += session.feed(audio[offset:offset + 333])
+    assert [event["type"] for event in events] == ["speech_start", "speech_end"]
+
+
+def test_finish_closes_open_utterance(executor, transcribed):
+    session = StreamingSession(executor, sample_rate=SAMPLE_RATE)
+    session.feed(silence(10) + speech(10))
+    assert [event["type"] for event in session.finish()] == ["speech_end"]
+    assert len(session.drain(timeout=5)) == 1
+
+
+def test_utterances_beyond_max_pending_are_dropped(executor, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(speech_service, "transcribe_pcm", lambda *args, **kwargs: release.wait(5) and {})
+
+    session = StreamingSession(executor, sample_rate=SAMPLE_RATE, max_pending=1)
+    utterance = silence(10) + speech(10) + silence(40)
+    first = session.feed(utterance)
+    second = session.feed(utterance)
+    release.set()
+
+    assert first[-1]["type"] == "speech_end"
+    assert second[-1]["type"] == "error"
+
+
+def test_unsupported_stream_settings_are_rejected(executor):
+    with pytest.raises(ValueError):
+        StreamingSession(executor, sample_rate=44100)
+    with pytest.raises(ValueError):
+        StreamingSession(executor, encoding="mp3")
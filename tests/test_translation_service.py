@@ -0,0 +1,63 @@
+import pytest
+
+from src.deadline import Deadline, DeadlineExceeded
+from src.services.translation_service import LocalTranslationBackend, TranslationService
+
+PHRASES = {
+    ("en", "hi", "Drink plenty of water"): "खूब पानी पिएं",
+    ("en", "hi", "Rest well"): "अच्छे से आराम करें",
+    ("en", "hi", "Advice:"): "सलाह:",
+}
+
+TEXT = "**Advice:**\n\n- Drink plenty of water\n2. Rest well\n* Drink plenty of water"
+EXPECTED = "**सलाह:**\n\n- खूब पानी पिएं\n2. अच्छे से आराम करें\n* खूब पानी पिएं"
+
+
+@pytest.fixture(params=["1", "4"], ids=["sequential", "concurrent"])
+def service(request, monkeypatch):
+    monkeypatch.setenv("TRANSLATION_WORKERS", request.param)
+    return TranslationService(LocalTranslationBackend(PHRASES))
+
+
+def test_local_backend_uses_phrase_table_and_passes_unknown_text_through():
+    backend = LocalTranslationBackend(PHRASES)
+    assert backend.translate("Rest well", "en", "hi") == "अच्छे से आराम करें"
+    assert backend.translate("Rest well", "en", "ta") == "Rest well"
+    assert backend.calls == 2
+
+
+def test_markdown_layout_is_kept(service):
+    assert service.translate(TEXT, "en", "hi") == EXPECTED
+
+
+def test_each_distinct_segment_is_translated_once(service):
+    service.translate(TEXT, "en", "hi")
+    assert service.backend.calls == 3
+
+    assert service.translate(TEXT, "en", "hi") == EXPECTED
+    assert service.backend.calls == 3
+    assert service.get_stats()["segment_cache"]["hits"] >= 4
+
+
+def test_same_language_is_not_translated(service):
+    assert service.translate(TEXT, "en", "en") == TEXT
+    assert service.backend.calls == 0
+
+
+def test_set_backend_drops_cached_segments(service):
+    service.translate(TEXT, "en", "hi")
+    backend = LocalTranslationBackend()
+    service.set_backend(backend)
+    assert service.translate(TEXT, "en", "hi") == TEXT
+    assert backend.calls == 3
+
+
+def test_expired_deadline_stops_translation(service):
+    with pytest.raises(DeadlineExceeded):
+        service.translate(TEXT, "en", "hi", deadline=Deadline(0))
+    assert service.backend.calls == 0
+
+
+def test_cached_text_needs_no_time_budget(service):
+    service.translate(TEXT, "en", "hi")
+    assert service.translate(TEXT, "en", "hi", deadline=Deadline(0)) == EXPECTED